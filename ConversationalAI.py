@@ -3,32 +3,11 @@ import random
 import csv
 import os
 from datetime import datetime
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
 from difflib import get_close_matches
-import nltk
-import requests
 import json
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
-import pytz
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-try:
-    nltk.data.find('corpora/words')
-except LookupError:
-    nltk.download('words')
 
 class Chatbot:
     def __init__(self):
@@ -148,6 +127,8 @@ class Chatbot:
     def get_coordinates(self, city):
         """Get coordinates for a given city using Open-Meteo Geocoding API."""
         try:
+            import requests
+
             url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1&language=en&format=json"
             response = requests.get(url)
 
@@ -171,6 +152,8 @@ class Chatbot:
 
         lat, lon, city, country = coordinates
         try:
+            import requests
+
             url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true&temperature_unit=celsius"
             response = requests.get(url)
 
@@ -223,6 +206,10 @@ class Chatbot:
     def get_time_in_location(self, location):
         """Get current time in the specified location."""
         try:
+            import pytz
+            from geopy.geocoders import Nominatim
+            from timezonefinder import TimezoneFinder
+
             geolocator = Nominatim(user_agent="chatbot")
             geocode_result = geolocator.geocode(location)
             if geocode_result:
@@ -0,0 +1,85 @@
+# benchmarks/ann_recall.py
+
+import argparse
+import random
+import time
+
+from sklearn.preprocessing import normalize
+
+from utils.data_loader import QA_DATASET_PATH, build_qa_vectorizer, load_qa_dataset
+from utils.retrieval import ANN_DIMENSIONS, ANN_RERANK, ANNIndex, InvertedIndex
+
+def synthetic_questions(count, seed=0, vocabulary_size=50000, topic_size=30, length=8):
+    """Questions drawn from overlapping topic vocabularies, ~20 per topic."""
+    rng = random.Random(seed)
+    vocabulary = [f'w{index}' for index in range(vocabulary_size)]
+    questions = []
+    while len(questions) < count:
+        topic = rng.sample(vocabulary, topic_size)
+        for _ in range(min(20, count - len(questions))):
+            questions.append(' '.join(rng.sample(topic, length)))
+    return questions
+
+def noisy_queries(questions, count, seed=0, drop=0.3):
+    """Corpus questions with a share of their words dropped."""
+    rng = random.Random(seed)
+    queries = []
+    for question in rng.sample(questions, min(count, len(questions))):
+        words = [word for word in question.split() if rng.random() > drop]
+        queries.append(' '.join(words or question.split()[:1]))
+    return queries
+
+def timed(search, query_vectors):
+    start = time.perf_counter()
+    results = [
+        search(query_vectors.indices[begin:end], query_vectors.data[begin:end])
+        for begin, end in zip(query_vectors.indptr[:-1], query_vectors.indptr[1:])
+    ]
+    return results, (time.perf_counter() - start) / max(1, len(results)) * 1000
+
+def recall(exact_results, approximate_results, k):
+    """Share of the exact top-k doc ids that the approximate top-k also found."""
+    found = total = 0
+    for exact, approximate in zip(exact_results, approximate_results):
+        expected = {doc_id for doc_id, _ in exact[:k]}
+        found += len(expected & {doc_id for doc_id, _ in approximate[:k]})
+        total += len(expected)
+    return found / total if total else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Report ANN QA retrieval recall@k and latency against exact scoring.")
+    parser.add_argument('--dataset', default=QA_DATASET_PATH)
+    parser.add_argument('--synthetic', type=int, default=0, help="use N generated questions instead of the dataset")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--probes', default='1,2,4,8,16,32')
+    parser.add_argument('--dimensions', type=int, default=ANN_DIMENSIONS)
+    parser.add_argument('--rerank', type=int, default=ANN_RERANK)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        questions = synthetic_questions(args.synthetic)
+        vectorizer = build_qa_vectorizer()
+        doc_vectors = vectorizer.fit_transform(questions)
+    else:
+        _, questions, doc_vectors, vectorizer, _ = load_qa_dataset(args.dataset)
+    query_vectors = normalize(vectorizer.transform(noisy_queries(questions, args.queries)), norm='l2')
+
+    exact_index = InvertedIndex(vectorizer, doc_vectors)
+    exact, exact_ms = timed(lambda terms, weights: exact_index.search_vector(terms, weights, args.k), query_vectors)
+
+    start = time.perf_counter()
+    ann = ANNIndex(vectorizer, doc_vectors, dimensions=args.dimensions, rerank=args.rerank)
+    build_seconds = time.perf_counter() - start
+    print(f"{ann.num_docs} questions, {len(ann.centroids)} lists, "
+          f"{ann.embeddings.shape[1]} dimensions, built in {build_seconds:.1f}s")
+    print(f"exact: {exact_ms:.3f} ms/query")
+    print(f"{'probes':>6} {'recall@1':>9} {'recall@' + str(args.k):>9} {'ms/query':>9}")
+    for probes in (int(value) for value in args.probes.split(',')):
+        ann.probes = probes
+        approximate, ann_ms = timed(lambda terms, weights: ann.search_vector(terms, weights, args.k), query_vectors)
+        print(f"{probes:>6} {recall(exact, approximate, 1):>9.3f} "
+              f"{recall(exact, approximate, args.k):>9.3f} {ann_ms:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/date_parsing.py
+
+import argparse
+import time
+from datetime import datetime
+
+from utils.date_extraction import SEARCH_LANGUAGES, SEARCH_SETTINGS, fast_search_dates, search_dates
+
+# Messages as they reach the booking date steps.
+MESSAGES = [
+    '15th of December',
+    'I would like to fly on the 15th of December',
+    'December 15',
+    'December 1 2024',
+    'on 15/12/2026',
+    'next Friday',
+    'tomorrow please',
+    'from the 15th of December to the 20th of December',
+    'leaving December 15 and coming back December 22',
+    'Dec 3rd, 2026',
+    'in 3 days',
+    'single',
+    'flexible dates around 10 march',
+]
+
+def per_call_ms(function, messages, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        for message in messages:
+            function(message)
+    return (time.perf_counter() - start) / (runs * len(messages)) * 1000
+
+def days(results):
+    return [found.date() for _, found in results or []]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call date extraction latency with dateparser.")
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    from dateparser.search import search_dates as dateparser_search_dates
+
+    now = datetime.now()
+    settings = dict(SEARCH_SETTINGS, RELATIVE_BASE=now)
+    # Load dateparser's language data before timing anything.
+    dateparser_search_dates('warm up on 1 January', settings=settings)
+    dateparser_search_dates('warm up on 1 January', languages=SEARCH_LANGUAGES, settings=settings)
+
+    print(f"{'message':52} {'dateparser':>10} {'pinned':>8} {'fast':>8}  ms/call")
+    totals = [0.0, 0.0, 0.0]
+    for message in MESSAGES:
+        timings = [
+            per_call_ms(lambda text: dateparser_search_dates(text, settings=settings), [message], args.runs),
+            per_call_ms(lambda text: dateparser_search_dates(
+                text, languages=SEARCH_LANGUAGES, settings=settings), [message], args.runs),
+            per_call_ms(lambda text: search_dates(text, now=now), [message], args.runs),
+        ]
+        totals = [total + timing for total, timing in zip(totals, timings)]
+        path = 'fast' if fast_search_dates(message, now) else 'fallback'
+        print(f"{message[:52]:52} {timings[0]:10.3f} {timings[1]:8.3f} {timings[2]:8.3f}  ({path})")
+    print(f"{'mean':52} " + ' '.join(f"{total / len(MESSAGES):{width}.3f}" for total, width in zip(totals, (10, 8, 8))))
+
+    print("\nfast path vs dateparser (English):")
+    for message in MESSAGES:
+        fast = fast_search_dates(message, now)
+        if fast:
+            expected = days(dateparser_search_dates(message, languages=SEARCH_LANGUAGES, settings=settings))
+            verdict = 'same' if days(fast) == expected else f'dateparser says {expected}'
+            print(f"  {message[:52]:52} {days(fast)} {verdict}")
+
+if __name__ == '__main__':
+    main()
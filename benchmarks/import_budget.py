@@ -0,0 +1,60 @@
+# benchmarks/import_budget.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points that must start without the heavy dependencies below.
+MODULES = ('chatbot', 'main', 'server', 'utils.worker_pool', 'utils.sqlite_inventory')
+
+# Loaded only by the first message (or command) that needs them. numpy is
+# deliberately not among them: the flight inventory, QA index and model
+# snapshots are NumPy arrays, and every entry point builds one at startup,
+# so deferring it (about 60 ms) would only move the cost, not save it.
+DEFERRED = ('sklearn', 'scipy', 'dateparser', 'geopy', 'timezonefinder', 'requests', 'pytz', 'nltk')
+
+IMPORT_BUDGET_MS = 500
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start)\n"
+    "print(' '.join(name for name in {deferred!r} if name in sys.modules))\n"
+)
+
+def measure(module, runs):
+    """Return (median import seconds, deferred modules it loaded) for a module,
+    each run in a fresh interpreter."""
+    times = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, deferred=DEFERRED)],
+            cwd=ROOT, capture_output=True, text=True, check=True).stdout.splitlines()
+        times.append(float(output[0]))
+        loaded.update(output[1].split() if len(output) > 1 else [])
+    return statistics.median(times), sorted(loaded)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check entry-point import time and deferred dependencies.")
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        seconds, loaded = measure(module, args.runs)
+        over_budget = seconds * 1000 > args.budget_ms
+        failed = failed or over_budget or bool(loaded)
+        status = 'FAIL' if over_budget or loaded else 'ok'
+        print(f"{status:4} {module:24} {seconds * 1000:8.1f} ms" + (f"  loads {', '.join(loaded)}" if loaded else ''))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
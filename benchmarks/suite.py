@@ -0,0 +1,320 @@
+# benchmarks/suite.py
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from benchmarks.ann_recall import noisy_queries, synthetic_questions
+from chatbot import Chatbot
+from utils.data_loader import build_qa_vectorizer
+from utils.flight_inventory import DATE_FORMAT, TICKETS_PATH, FlightInventory
+from utils.intent_processor import get_intent
+from utils.reservations import ReservationEngine
+from utils.route_planner import RoutePlanner
+from utils.session import Session
+from utils.weather_service import WeatherClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_VERSION = 1
+QA_SIZES = '1000,10000,100000'
+INVENTORY_SIZES = '1000,10000,100000'
+# A p95 more than this much slower than the baseline's is a regression.
+REGRESSION_TOLERANCE = 0.2
+
+INTENT_MESSAGES = [
+    'hello', 'hi there', 'what can you do?', 'how are you', 'what is my name?',
+    'what time is it', 'what is the date today', 'book a flight', 'i want to fly to paris',
+    "what's the weather in london", 'thanks, bye', 'tell me a joke',
+]
+
+# A single trip over the synthetic inventory's guaranteed London-Paris flight.
+BOOKING_SCRIPT = ['from London to Paris', 'single', 'December 1 2024', '1', 'proceed']
+BOOKING_DATE = date(2024, 12, 1)
+
+COLD_START_PROBE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "from chatbot import Chatbot\n"
+    "imported = time.perf_counter()\n"
+    "bot = Chatbot(journal_path={journal_path!r})\n"
+    "initialized = time.perf_counter()\n"
+    "bot.find_best_qa_match('how are glacier caves formed?')\n"
+    "answered = time.perf_counter()\n"
+    "print(imported - start, initialized - imported, answered - initialized)\n"
+)
+
+def summarize(latencies, elapsed):
+    """p50/p95/p99 and mean latency in milliseconds, plus calls per second."""
+    milliseconds = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+    return {
+        'count': len(latencies),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(milliseconds.mean()), 4),
+        'throughput_per_s': round(len(latencies) / elapsed, 2) if elapsed else None,
+    }
+
+def measure(function, inputs, iterations, warmup=10):
+    """Call function on inputs round-robin, timing each call."""
+    for index in range(min(warmup, iterations)):
+        function(inputs[index % len(inputs)])
+    latencies = []
+    start = time.perf_counter()
+    for index in range(iterations):
+        argument = inputs[index % len(inputs)]
+        call_start = time.perf_counter()
+        function(argument)
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+def bench_cold_start(runs, journal_dir):
+    """Import, Chatbot() and first QA answer (model load), each in a fresh interpreter."""
+    phases = ([], [], [])
+    probe = COLD_START_PROBE.format(journal_path=os.path.join(journal_dir, 'cold-start.journal'))
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', probe],
+            cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+        for samples, seconds in zip(phases, output[-3:]):
+            samples.append(float(seconds))
+    names = ('cold_start.import', 'cold_start.init', 'cold_start.first_qa_match')
+    return {name: summarize(samples, sum(samples)) for name, samples in zip(names, phases)}
+
+def bench_intent(bot, iterations):
+    models = bot.models
+    return {'get_intent': measure(
+        lambda message: get_intent(
+            message, models.intent_vectorizer, models.intent_vectors, models.intent_mapping),
+        INTENT_MESSAGES, iterations)}
+
+def synthetic_qa_models(size):
+    questions = synthetic_questions(size)
+    vectorizer = build_qa_vectorizer()
+    vectors = vectorizer.fit_transform(questions)
+    qa_pairs = {question: f'answer {index}' for index, question in enumerate(questions)}
+    return (qa_pairs, questions, vectors, vectorizer, None), questions
+
+def bench_qa(bot, sizes, iterations):
+    results = {}
+    models = bot.models
+    intent_models = models[models._fields.index('intents'):]
+    for size in sizes:
+        qa_models, questions = synthetic_qa_models(size)
+        bot.set_models(qa_models, intent_models)
+        queries = noisy_queries(questions, 500, seed=size)
+        results[f'find_best_qa_match[n={size}]'] = measure(bot.find_best_qa_match, queries, iterations)
+    bot.set_models(tuple(models[1:6]), intent_models)
+    return results
+
+def synthetic_inventory(size, seed=0, cities=50, days=60):
+    """Random flights between `cities` cities over `days` days, plus one
+    London-Paris flight on BOOKING_DATE with seats to spare."""
+    rng = random.Random(seed)
+    names = ['London', 'Paris'] + [f'City {index}' for index in range(cities - 2)]
+    flights = [{
+        'flight_id': 1, 'departure_city': 'London', 'destination_city': 'Paris',
+        'departure_date': BOOKING_DATE.strftime(DATE_FORMAT),
+        'available_seats': 10 ** 6, 'price': 150.0,
+    }]
+    for flight_id in range(2, size + 1):
+        departure, destination = rng.sample(names, 2)
+        flights.append({
+            'flight_id': flight_id, 'departure_city': departure, 'destination_city': destination,
+            'departure_date': (BOOKING_DATE + timedelta(days=rng.randrange(days))).strftime(DATE_FORMAT),
+            'available_seats': rng.randint(0, 200), 'price': float(rng.randint(50, 1500)),
+        })
+    return FlightInventory(flights), flights
+
+def use_inventory(bot, inventory, journal_path):
+    """Point the bot's flight search and bookings at another inventory."""
+    previous = bot.tickets, bot.route_planner, bot.reservations
+    bot.tickets = inventory
+    bot.route_planner = RoutePlanner(inventory)
+    bot.reservations = ReservationEngine(inventory, journal_path=journal_path)
+    return previous
+
+def bench_inventory(bot, sizes, iterations, journal_dir):
+    results = {}
+    for size in sizes:
+        inventory, flights = synthetic_inventory(size, seed=size)
+        previous = use_inventory(bot, inventory, os.path.join(journal_dir, f'inventory-{size}.journal'))
+        rng = random.Random(size)
+        queries = [
+            (flight['departure_city'], flight['destination_city'], flight['departure_date'])
+            for flight in rng.sample(flights, min(500, len(flights)))
+        ]
+        results[f'check_flight_availability[n={size}]'] = measure(
+            lambda query: bot.check_flight_availability(*query), queries, iterations)
+        bot.reservations.journal.close()
+        bot.tickets, bot.route_planner, bot.reservations = previous
+    return results
+
+def bench_booking(bot, iterations, journal_dir):
+    """A whole single-trip booking through handle_transaction, one fresh
+    session per conversation (the last step waits for the journal fsync)."""
+    inventory, _ = synthetic_inventory(10000)
+    previous = use_inventory(bot, inventory, os.path.join(journal_dir, 'booking.journal'))
+
+    def converse(_):
+        with bot.bind_session(Session()):
+            bot.in_transaction = True
+            for message in BOOKING_SCRIPT:
+                reply = bot.handle_transaction(message)
+        if not reply.startswith('Your booking is confirmed'):
+            raise RuntimeError(f"Scripted booking did not complete: {reply}")
+
+    try:
+        return {'booking_conversation': measure(converse, [None], iterations, warmup=2)}
+    finally:
+        bot.reservations.journal.close()
+        bot.tickets, bot.route_planner, bot.reservations = previous
+
+class WeatherStubHandler(BaseHTTPRequestHandler):
+    """Canned Open-Meteo geocoding and forecast responses."""
+
+    def do_GET(self):
+        if self.path.startswith('/v1/search'):
+            body = {'results': [{
+                'latitude': 52.95, 'longitude': -1.15, 'name': 'Nottingham', 'country': 'United Kingdom'}]}
+        else:
+            body = {'current_weather': {'temperature': 12.5, 'windspeed': 9.0}}
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def bench_weather(iterations):
+    """get_weather against a local stub server, with and without its caches."""
+    ThreadingHTTPServer.protocol_version = 'HTTP/1.1'
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WeatherStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    client = WeatherClient(geocoding_url=f'{base_url}/search', forecast_url=f'{base_url}/forecast')
+
+    def uncached(location):
+        client.geocode_cache.clear()
+        client.weather_cache.clear()
+        return client.get_weather(location)
+
+    try:
+        if not client.get_weather('Nottingham').startswith('The current temperature'):
+            raise RuntimeError("Weather stub server did not answer")
+        return {
+            'get_weather[uncached]': measure(uncached, ['Nottingham'], iterations),
+            'get_weather[cached]': measure(client.get_weather, ['Nottingham'], iterations),
+        }
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, tolerance):
+    """Print p50/p95 against a baseline run; return the regressed benchmarks."""
+    regressed = []
+    print(f"\n{'benchmark':40} {'p50 base':>10} {'p50 now':>10} {'p95 base':>10} {'p95 now':>10}  change")
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        change = current['p95_ms'] / previous['p95_ms'] - 1 if previous['p95_ms'] else 0.0
+        flag = ' REGRESSION' if change > tolerance else ''
+        if flag:
+            regressed.append(name)
+        print(f"{name:40} {previous['p50_ms']:10.3f} {current['p50_ms']:10.3f} "
+              f"{previous['p95_ms']:10.3f} {current['p95_ms']:10.3f}  {change:+.1%}{flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the intent, QA, booking and weather paths.")
+    parser.add_argument('--iterations', type=int, default=1000, help="timed calls per benchmark")
+    parser.add_argument('--booking-iterations', type=int, default=200)
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--qa-sizes', default=QA_SIZES)
+    parser.add_argument('--inventory-sizes', default=INVENTORY_SIZES)
+    parser.add_argument('--only', default='cold_start,intent,qa,inventory,booking,weather',
+                        help="comma-separated groups to run")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', help="baseline JSON from an earlier run")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    groups = set(args.only.split(','))
+    random.seed(0)
+    results = {}
+    # Journals and the ticket copy live in a scratch directory, so bookings
+    # made by one run are never replayed into the next (or into the app's
+    # own bookings.journal).
+    with tempfile.TemporaryDirectory() as journal_dir:
+        if 'cold_start' in groups:
+            results.update(bench_cold_start(args.cold_runs, journal_dir))
+
+        tickets_path = os.path.join(journal_dir, os.path.basename(TICKETS_PATH))
+        shutil.copyfile(os.path.join(ROOT, TICKETS_PATH), tickets_path)
+        bot = Chatbot(tickets_path, journal_path=os.path.join(journal_dir, 'bookings.journal'))
+        if 'intent' in groups:
+            results.update(bench_intent(bot, args.iterations))
+        if 'qa' in groups:
+            results.update(bench_qa(bot, [int(size) for size in args.qa_sizes.split(',')], args.iterations))
+        if 'inventory' in groups:
+            results.update(bench_inventory(
+                bot, [int(size) for size in args.inventory_sizes.split(',')], args.iterations, journal_dir))
+        if 'booking' in groups:
+            results.update(bench_booking(bot, args.booking_iterations, journal_dir))
+    if 'weather' in groups:
+        results.update(bench_weather(args.iterations))
+
+    print(f"{'benchmark':40} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'per s':>10}")
+    for name, result in results.items():
+        print(f"{name:40} {result['p50_ms']:10.3f} {result['p95_ms']:10.3f} "
+              f"{result['p99_ms']:10.3f} {result['throughput_per_s'] or 0:10.1f}")
+
+    report = {
+        'version': RESULTS_VERSION,
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,61 +1,91 @@
 import re
-import dateparser
-import csv
+import itertools
 import random
-import pytz
-import numpy as np
-from dateparser.search import search_dates
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from sklearn.metrics.pairwise import cosine_similarity
-from utils.data_loader import load_qa_dataset
+from utils.flight_inventory import TICKETS_PATH, FlightInventory, arrival_ordinal, cheapest_round_trip, parse_date
+from utils.cache import TTLCache
+from utils.date_extraction import search_dates
+from utils.metrics import Metrics
+from utils.patterns import PatternGroup
+from utils.reservations import JOURNAL_PATH, ReservationEngine
+from utils.route_planner import RoutePlanner
+from utils.session import Session
+from utils.sqlite_inventory import SqliteInventory
 from utils.intent_processor import (
-    initialize_intents,
-    get_intent,
+    get_intents,
+    detect_booking,
     extract_name,
     extract_location,
     extract_time_location,
 )
-from utils.weather_service import get_weather, get_time_in_location
+from utils.weather_service import (
+    aget_time_in_location,
+    aget_weather,
+    get_time_in_location,
+    get_weather,
+    reset_weather_cache_stats,
+    weather_cache_stats,
+)
 from datetime import datetime
 
+QA_MATCH_THRESHOLD = 0.3
+INTENT_THRESHOLD = 0.7
+FLEXIBLE_DATE_WINDOW = 3
+MAX_FLIGHT_OPTIONS = 10
+MAX_CONNECTION_OPTIONS = 3
+ROUTING_CACHE_SIZE = 4096
+ROUTING_CACHE_TTL = 3600
+ERROR_RESPONSE = "Sorry, something went wrong with that message. Please try again."
+# Score only the questions of this many best matching source documents
+# (two-stage retrieval); None scores every question, which the MaxScore
+# index already does faster on corpora of the sizes measured so far.
+QA_TOP_SOURCES = None
+# Approximate QA retrieval for very large corpora: probe this many IVF
+# clusters of SVD-projected vectors and rerank exactly (more probes, better
+# recall); None keeps exact scoring. See benchmarks/ann_recall.py.
+QA_ANN_PROBES = None
+
+CITY_PATTERNS = [
+    # Pattern 1: from City1 to City2
+    r'from\s+([A-Za-z\s\-]+?)\s+to\s+([A-Za-z\s\-]+)',
+    # Pattern 2: to City2 from City1
+    r'to\s+([A-Za-z\s\-]+?)\s+from\s+([A-Za-z\s\-]+)',
+    # Pattern 3: City1 - City2
+    r'([A-Za-z\s\-]+?)\s*-\s*([A-Za-z\s\-]+)',
+    # Pattern 4: City1 to City2
+    r'([A-Za-z\s\-]+?)\s+to\s+([A-Za-z\s\-]+)',
+    # Pattern 5: from City
+    r'from\s+([A-Za-z\s\-]+)',
+    # Pattern 6: to City
+    r'to\s+([A-Za-z\s\-]+)',
+]
+CITY_MATCHER = PatternGroup('cities', CITY_PATTERNS)
+
 def extract_cities(user_input):
     """Extract departure and destination cities from user input."""
-    user_input = user_input.lower()
-    patterns = [
-        # Pattern 1: from City1 to City2
-        r'from\s+([A-Za-z\s\-]+?)\s+to\s+([A-Za-z\s\-]+)',
-        # Pattern 2: to City2 from City1
-        r'to\s+([A-Za-z\s\-]+?)\s+from\s+([A-Za-z\s\-]+)',
-        # Pattern 3: City1 - City2
-        r'([A-Za-z\s\-]+?)\s*-\s*([A-Za-z\s\-]+)',
-        # Pattern 4: City1 to City2
-        r'([A-Za-z\s\-]+?)\s+to\s+([A-Za-z\s\-]+)',
-        # Pattern 5: from City
-        r'from\s+([A-Za-z\s\-]+)',
-        # Pattern 6: to City
-        r'to\s+([A-Za-z\s\-]+)',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, user_input)
-        if match:
-            groups = match.groups()
-            if len(groups) == 2:
+    match = CITY_MATCHER.search(user_input.lower())
+    if match:
+        groups = match.captures
+        if len(groups) == 2:
+            departure = groups[0].strip().title()
+            destination = groups[1].strip().title()
+            return departure, destination
+        elif len(groups) == 1:
+            if 'from' in match.pattern:
                 departure = groups[0].strip().title()
-                destination = groups[1].strip().title()
-                return departure, destination
-            elif len(groups) == 1:
-                if 'from' in pattern:
-                    departure = groups[0].strip().title()
-                    return departure, None
-                elif 'to' in pattern:
-                    destination = groups[0].strip().title()
-                    return None, destination
+                return departure, None
+            elif 'to' in match.pattern:
+                destination = groups[0].strip().title()
+                return None, destination
     return None, None
 
 def extract_single_date(user_input):
     """Extract a single date from user input."""
-    dates = search_dates(user_input, settings={'PREFER_DATES_FROM': 'future'})
+    dates = search_dates(user_input)
     if dates:
         date = dates[0][1]
         return date.strftime('%d/%m/%Y')
@@ -67,8 +97,8 @@ def extract_travel_dates(user_input):
     user_input = user_input.lower()
     flexible = 'flexible' in user_input
 
-    # Use dateparser to parse natural language dates
-    dates = search_dates(user_input, settings={'PREFER_DATES_FROM': 'future'})
+    # Common date forms are parsed directly, anything else by dateparser
+    dates = search_dates(user_input)
 
     if dates:
         parsed_dates = [date[1] for date in dates]
@@ -105,8 +135,27 @@ def extract_new_return_date(user_input):
             return f"{day}/{current_month}/{current_year}"
     return None
 
+def is_question(user_input):
+    """Check if input is a question."""
+    return (
+        user_input.strip().endswith('?') or
+        user_input.strip().lower().startswith(
+            ('what', 'how', 'why', 'where', 'when', 'who')
+        )
+    )
+
+def routing_key(user_input):
+    """Cache key for routing: case and whitespace never change a decision."""
+    return ' '.join(user_input.lower().split())
+
+def flight_leg_ids(flight):
+    """Flight ids of every leg of a flight or connecting itinerary."""
+    return [leg['flight_id'] for leg in flight.get('legs', [flight])]
+
 def get_current_time_in_nottingham():
     """Get the current time in Nottingham."""
+    import pytz
+
     nottingham_timezone = pytz.timezone('Europe/London')
     now_nottingham = datetime.now(nottingham_timezone)
     return now_nottingham
@@ -123,60 +172,265 @@ def get_time_of_day(now):
     else:
         return 'night'
 
+class ExternalCall:
+    """A response that needs a network lookup (weather, time abroad).
+
+    handle_batch(..., defer_external=True) returns one in place of the
+    response text, so the scoring thread never waits on an upstream API:
+    call it on another thread, or await resolve() on an event loop, to get
+    the text.
+    """
+
+    def __init__(self, metrics, service, function, coroutine, argument):
+        self.metrics = metrics
+        self.service = service
+        self.function = function
+        self.coroutine = coroutine
+        self.argument = argument
+
+    def __call__(self):
+        with self.metrics.timer('chatbot_external_call_seconds', service=self.service):
+            return self.function(self.argument)
+
+    async def resolve(self):
+        with self.metrics.timer('chatbot_external_call_seconds', service=self.service):
+            return await self.coroutine(self.argument)
+
+def _session_attribute(name):
+    """Expose a Session field as a Chatbot attribute of the bound session."""
+    return property(
+        lambda self: getattr(self.current_session(), name),
+        lambda self, value: setattr(self.current_session(), name, value),
+    )
+
+ModelSet = namedtuple('ModelSet', [
+    'generation',
+    'qa_pairs',
+    'questions',
+    'qa_vectors',
+    'qa_vectorizer',
+    'qa_sources',
+    'qa_index',
+    'qa_exact',
+    'intents',
+    'intent_mapping',
+    'intent_vectors',
+    'intent_vectorizer',
+    'capabilities_response',
+    'small_talk_responses',
+    'greeting_responses',
+    'farewell_responses',
+])
+
+def load_models(reload_intents=False, snapshot_dir=None):
+    """Load the QA and intent models (see utils.model_snapshot)."""
+    from utils import model_snapshot
+
+    return model_snapshot.load_models(
+        snapshot_dir or model_snapshot.SNAPSHOT_DIR, reload_intents=reload_intents)
+
+def build_model_set(qa_models, intent_models, generation=0):
+    """Bundle loaded models, with their retrieval indexes, into a ModelSet."""
+    from utils.retrieval import ExactMatchIndex, QAIndex
+
+    qa_pairs, questions, qa_vectors, qa_vectorizer, qa_sources = qa_models
+    return ModelSet(
+        generation,
+        qa_pairs,
+        questions,
+        qa_vectors,
+        qa_vectorizer,
+        qa_sources,
+        QAIndex(
+            qa_vectorizer, questions, qa_vectors, qa_sources,
+            top_sources=QA_TOP_SOURCES, ann_probes=QA_ANN_PROBES
+        ) if qa_pairs else None,
+        ExactMatchIndex(qa_vectorizer, questions, qa_vectors) if qa_pairs else None,
+        *intent_models
+    )
+
+def _model_attribute(name):
+    """Expose a ModelSet field as a read-only attribute of the pinned models."""
+    return property(lambda self: getattr(self.current_models(), name))
+
 class Chatbot:
-    def __init__(self):
-        self.in_transaction = False
-        self.transaction_data = {}
-        self.transaction_data = {
-            'departure_city': None,
-            'destination_city': None,
-            'trip_type': None,
-            'departure_date': None,
-            'return_date': None,
-            'date_flexible': None,
-        }
-        self.user_name = None
-        self.tickets = self.load_ticket_dataset()
-        self.conversation_history = []
-        self.qa_pairs, self.questions, self.qa_vectors, self.qa_vectorizer = load_qa_dataset()
-        (
-            self.intents,
-            self.intent_mapping,
-            self.intent_vectors,
-            self.intent_vectorizer,
-            self.capabilities_response,
-            self.small_talk_responses,
-            self.greeting_responses,
-            self.farewell_responses
-        ) = initialize_intents()
-
-    def load_ticket_dataset(self):
-        """Load the ticket dataset from a CSV file."""
-        tickets = []
+    user_name = _session_attribute('user_name')
+    in_transaction = _session_attribute('in_transaction')
+    transaction_data = _session_attribute('transaction_data')
+    conversation_history = _session_attribute('conversation_history')
+
+    qa_pairs = _model_attribute('qa_pairs')
+    questions = _model_attribute('questions')
+    qa_vectors = _model_attribute('qa_vectors')
+    qa_vectorizer = _model_attribute('qa_vectorizer')
+    qa_sources = _model_attribute('qa_sources')
+    qa_index = _model_attribute('qa_index')
+    qa_exact = _model_attribute('qa_exact')
+    intents = _model_attribute('intents')
+    intent_mapping = _model_attribute('intent_mapping')
+    intent_vectors = _model_attribute('intent_vectors')
+    intent_vectorizer = _model_attribute('intent_vectorizer')
+    capabilities_response = _model_attribute('capabilities_response')
+    small_talk_responses = _model_attribute('small_talk_responses')
+    greeting_responses = _model_attribute('greeting_responses')
+    farewell_responses = _model_attribute('farewell_responses')
+
+    def __init__(self, tickets_path=TICKETS_PATH, metrics=None, journal_path=JOURNAL_PATH,
+                 snapshot_dir=None):
+        self._local = threading.local()
+        self.snapshot_dir = snapshot_dir
+        self.session = Session()
+        self.tickets = self.load_ticket_dataset(tickets_path)
+        self.route_planner = RoutePlanner(self.tickets)
+        self.reservations = ReservationEngine(self.tickets, journal_path=journal_path)
+        self.routing_cache = TTLCache(ROUTING_CACHE_SIZE, ROUTING_CACHE_TTL)
+        self._generations = itertools.count()
+        self._reload_lock = threading.Lock()
+        # Loaded by the first call that needs them, which is also when
+        # scikit-learn and SciPy get imported.
+        self._models = None
+        self.metrics = metrics or Metrics()
+        self.metrics.add_collector(self._collect_metrics)
+
+    def _collect_metrics(self, metrics):
+        """Copy cache hit counts and sizes into the metrics before a snapshot."""
+        caches = dict(weather_cache_stats(), routing=self.routing_cache.stats())
+        for cache, stats in caches.items():
+            metrics.set_counter('chatbot_cache_requests_total', stats['hits'], cache=cache, result='hit')
+            metrics.set_counter('chatbot_cache_requests_total', stats['misses'], cache=cache, result='miss')
+            metrics.set_gauge('chatbot_cache_entries', stats['size'], cache=cache)
+
+    def reset_metrics(self):
+        """Start the metrics, and the cache hit counts they copy, from zero
+        (e.g. in a forked worker, so the parent's warm-up is not counted
+        once per worker)."""
+        self.routing_cache.reset_stats()
+        reset_weather_cache_stats()
+        self.metrics.reset()
+
+    @property
+    def models(self):
+        """The latest ModelSet, loaded on first use."""
+        models = self._models
+        if models is None:
+            with self._reload_lock:
+                if self._models is None:
+                    self.set_models(*load_models(snapshot_dir=self.snapshot_dir))
+                models = self._models
+        return models
+
+    def set_models(self, qa_models, intent_models):
+        """Build a new ModelSet and publish it with a single reference swap.
+
+        Calls already running keep the ModelSet they pinned (read-copy-update),
+        so they never block on a reload or see a mix of old and new models.
+        Routing decisions are cached per generation, and the previous ones
+        are dropped.
+        """
+        self._models = build_model_set(qa_models, intent_models, next(self._generations))
+        self.routing_cache.clear()
+
+    def reload_models(self, reload_intents=True, background=True):
+        """Refit (or load from a fresh snapshot) the QA and intent models and
+        swap them in. Runs in a daemon thread unless background is False;
+        the current models stay in service until the new ones are ready and
+        are kept if loading fails."""
+        def reload():
+            with self._reload_lock:
+                try:
+                    self.set_models(*load_models(reload_intents, self.snapshot_dir))
+                except Exception as e:
+                    self.metrics.increment('chatbot_errors_total', stage='reload')
+                    print(f"Error reloading models: {str(e)}")
+
+        if not background:
+            reload()
+            return None
+        thread = threading.Thread(target=reload, name='model-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def current_models(self):
+        """Return the ModelSet pinned by this thread, or the latest one
+        (which inside pin_models is pinned from then on)."""
+        models = getattr(self._local, 'models', None)
+        if models is None:
+            models = self.models
+            if getattr(self._local, 'pinning', False):
+                self._local.models = models
+        return models
+
+    @contextmanager
+    def pin_models(self):
+        """Use one ModelSet for the rest of this thread's current call
+        (a no-op inside another pin_models). The models are pinned, and
+        loaded if need be, on first use, so messages that never need them
+        (name extraction, bookings) never load scikit-learn."""
+        if getattr(self._local, 'pinning', False):
+            yield
+            return
+        self._local.pinning = True
         try:
-            with open('tickets.csv', 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    # Convert numerical fields
-                    row['flight_id'] = int(row['flight_id'])
-                    row['available_seats'] = int(row['available_seats'])
-                    row['price'] = float(row['price'])
-                    tickets.append(row)
-            return tickets
-        except Exception as e:
-            print(f"Error loading ticket dataset: {e}")
-            return []
-        
+            yield
+        finally:
+            self._local.pinning = False
+            self._local.models = None
+
+    def warm_up(self):
+        """Exercise lazily initialised code paths (e.g. dateparser's locale
+        data) so they are loaded once, for example before forking workers."""
+        # Named sessions, so the messages are routed: intent scoring, the
+        # exact-match and QA index lookups and the routing cache all run.
+        sessions = [Session(), Session()]
+        for session in sessions:
+            session.user_name = 'Guest'
+        self.handle_batch(['hello', 'how are glacier caves formed?'], sessions)
+        extract_travel_dates('from the 15th of December to the 20th of December')
+        # The fast path reads the dates above; relative phrases like this one
+        # go to dateparser, whose import and locale data are the slow part.
+        search_dates('in 3 days')
+
+    def current_session(self):
+        """Return the session bound to this thread, or the default session."""
+        return getattr(self._local, 'session', None) or self.session
+
+    @contextmanager
+    def bind_session(self, session):
+        """Route per-conversation state to `session` for the current thread."""
+        previous = getattr(self._local, 'session', None)
+        self._local.session = session
+        try:
+            yield session
+        finally:
+            self._local.session = previous
+
+    def load_ticket_dataset(self, path=TICKETS_PATH):
+        """Load the ticket dataset: a SQLite inventory shared between worker
+        processes for .db/.sqlite paths, otherwise an in-memory copy of a CSV."""
+        if path.endswith(('.db', '.sqlite')):
+            return SqliteInventory(path)
+        return FlightInventory.from_csv(path)
+
     def check_flight_availability(self, departure_city, destination_city, date):
         """Check flight availability in the dataset."""
-        available_flights = []
-        for ticket in self.tickets:
-            if (ticket['departure_city'].lower() == departure_city.lower() and
-                ticket['destination_city'].lower() == destination_city.lower() and
-                ticket['departure_date'] == date and
-                ticket['available_seats'] > 0):
-                available_flights.append(ticket)
-        return available_flights
+        with self.metrics.timer('chatbot_stage_seconds', stage='flight_search'):
+            return self.tickets.find(departure_city, destination_city, date)
+
+    def check_flexible_flight_availability(self, departure_city, destination_city, date):
+        """Find the cheapest flights within FLEXIBLE_DATE_WINDOW days of a date."""
+        with self.metrics.timer('chatbot_stage_seconds', stage='flight_search'):
+            return self.tickets.find_flexible(
+                departure_city, destination_city, date,
+                FLEXIBLE_DATE_WINDOW, limit=MAX_FLIGHT_OPTIONS
+            )
+
+    def find_connecting_flights(self, departure_city, destination_city, date, window_days=0):
+        """Find the cheapest 1-2 stop itineraries when there is no direct flight,
+        leaving within +/- window_days of the date."""
+        with self.metrics.timer('chatbot_stage_seconds', stage='connection_search'):
+            return self.route_planner.search(
+                departure_city, destination_city, date, limit=MAX_CONNECTION_OPTIONS,
+                window_days=window_days)
 
     def get_welcome_message(self):
         """Return the welcome message."""
@@ -192,29 +446,95 @@ class Chatbot:
         current_date = datetime.now().strftime("%B %d, %Y")
         return f"Today's date is {current_date}"
 
+    def add_qa(self, question, answer, source=None):
+        """Add a question/answer pair (from an optional source document) to
+        the live QA models, or change the answer of an existing question.
+        Only the new question is indexed; the change lasts until the models
+        are next reloaded."""
+        models = self.models
+        if models.qa_index is None:
+            return False
+        question = question.lower()
+        # The answer is in place before the question becomes searchable.
+        models.qa_pairs[question] = answer
+        if models.qa_index.doc_id(question) is None:
+            doc_id = models.qa_index.add([question], [source])[0]
+            models.qa_exact.add(doc_id, question)
+        return True
+
+    def remove_qa(self, question):
+        """Stop matching a question (until the models are next reloaded)."""
+        models = self.models
+        if models.qa_index is None:
+            return False
+        question = question.lower()
+        doc_id = models.qa_index.doc_id(question)
+        if doc_id is None:
+            return False
+        models.qa_exact.remove(doc_id, question)
+        models.qa_index.remove(question)
+        # The answer stays in qa_pairs for calls that already matched it.
+        return True
+
+    def qa_source(self, question):
+        """Return the source document of a dataset question, or None."""
+        if self.qa_index is None:
+            return None
+        return self.qa_index.source(self.qa_index.doc_id(question))
+
     def find_best_qa_match(self, user_input):
+        """Return the dataset question most similar to the input, if any."""
+        with self.pin_models():
+            return self._find_best_qa_match(user_input)
+
+    def _find_best_qa_match(self, user_input):
         if not self.qa_pairs:
             return None
 
         try:
-            input_vector = self.qa_vectorizer.transform([user_input])
-            similarities = cosine_similarity(input_vector, self.qa_vectors)[0]
-            best_match_index = np.argmax(similarities)
-            best_match_score = similarities[best_match_index]
-
-            if best_match_score >= 0.3:
+            # Repeats of dataset questions are answered without scoring.
+            exact_match = self.qa_exact.lookup(user_input)
+            if exact_match is not None:
+                return self.questions[exact_match]
+            matches = self.qa_index.search(user_input, k=1, min_score=QA_MATCH_THRESHOLD)
+            if matches:
+                best_match_index, best_match_score = matches[0]
                 return self.questions[best_match_index]
         except Exception as e:
+            self.metrics.increment('chatbot_errors_total', stage='qa_match')
             print(f"Error in QA matching: {str(e)}")
 
         return None
 
     
+    def find_best_qa_matches(self, user_inputs):
+        """Batch version of find_best_qa_match scoring all inputs at once."""
+        with self.pin_models():
+            return self._find_best_qa_matches(user_inputs)
+
+    def _find_best_qa_matches(self, user_inputs):
+        if not self.qa_pairs:
+            return [None] * len(user_inputs)
+
+        try:
+            best_matches = [self.qa_exact.lookup(user_input) for user_input in user_inputs]
+            misses = [index for index, doc_id in enumerate(best_matches) if doc_id is None]
+            if misses:
+                results = self.qa_index.search_batch(
+                    [user_inputs[index] for index in misses], k=1, min_score=QA_MATCH_THRESHOLD)
+                for index, matches in zip(misses, results):
+                    best_matches[index] = matches[0][0] if matches else None
+            return [self.questions[doc_id] if doc_id is not None else None for doc_id in best_matches]
+        except Exception as e:
+            self.metrics.increment('chatbot_errors_total', stage='qa_match')
+            print(f"Error in QA matching: {str(e)}")
+
+        return [None] * len(user_inputs)
+
     def handle_transaction(self, user_input):
         """Handle the flight booking transaction."""
         if 'quit transaction' in user_input.lower():
-            self.in_transaction = False
-            self.transaction_data = {}
+            self.end_transaction()
             return "Transaction cancelled."
 
         # Step 1: Get departure and destination cities
@@ -248,6 +568,7 @@ class Chatbot:
             departure_date, return_date, flexible = extract_travel_dates(user_input)
             if departure_date:
                 self.transaction_data['departure_date'] = departure_date
+                self.transaction_data['date_flexible'] = flexible
                 if self.transaction_data['trip_type'] == 'return':
                     if return_date:
                         self.transaction_data['return_date'] = return_date
@@ -274,28 +595,49 @@ class Chatbot:
         if 'proceed' in user_input.lower():
             return self.finalize_booking()
         elif 'cancel' in user_input.lower():
-            self.in_transaction = False
-            self.transaction_data = {}
+            self.end_transaction()
             return "Booking cancelled."
         return "Last step! Would you like to proceed with the booking?"
 
     def search_and_present_flights(self):
         """Search for flights and present options to the user."""
-        # Check availability for departure flight
-        available_flights = self.check_flight_availability(
+        if self.transaction_data.get('date_flexible'):
+            search = self.check_flexible_flight_availability
+            window_days = FLEXIBLE_DATE_WINDOW
+        else:
+            search = self.check_flight_availability
+            window_days = 0
+
+        # Check availability for departure flight, falling back to connections
+        available_flights = [flight for flight in search(
             self.transaction_data['departure_city'],
             self.transaction_data['destination_city'],
             self.transaction_data['departure_date']
-        )
+        ) if self.is_bookable(flight)] or [flight for flight in self.find_connecting_flights(
+            self.transaction_data['departure_city'],
+            self.transaction_data['destination_city'],
+            self.transaction_data['departure_date'],
+            window_days
+        ) if self.is_bookable(flight)]
         self.transaction_data['available_flights'] = available_flights
 
         # Check availability for return flight if it's a return trip
         if self.transaction_data['trip_type'] == 'return':
-            return_flights = self.check_flight_availability(
+            return_flights = [flight for flight in search(
                 self.transaction_data['destination_city'],
                 self.transaction_data['departure_city'],
                 self.transaction_data['return_date']
-            )
+            ) if self.is_bookable(flight)] or [flight for flight in self.find_connecting_flights(
+                self.transaction_data['destination_city'],
+                self.transaction_data['departure_city'],
+                self.transaction_data['return_date'],
+                window_days
+            ) if self.is_bookable(flight)]
+            # A flexible window can reach back before every outbound arrival.
+            if available_flights:
+                earliest_arrival = min(arrival_ordinal(flight) for flight in available_flights)
+                return_flights = [flight for flight in return_flights
+                                  if parse_date(flight['departure_date']) >= earliest_arrival]
             self.transaction_data['return_flights'] = return_flights
         else:
             self.transaction_data['return_flights'] = []
@@ -328,29 +670,49 @@ class Chatbot:
     def present_flight_options(self):
         """Present available flight options to the user."""
         message = "Here are the available flights:\n"
+        if self.transaction_data.get('date_flexible'):
+            message = f"Here are the cheapest flights within {FLEXIBLE_DATE_WINDOW} days of your dates:\n"
 
         # List departure flights
         message += "\nDeparture flights:\n"
         for idx, flight in enumerate(self.transaction_data['available_flights'], start=1):
-            message += f"{idx}. Flight {flight['flight_id']} from {flight['departure_city']} to {flight['destination_city']} on {flight['departure_date']} at ${flight['price']}\n"
+            message += self.describe_flight(idx, flight)
 
         # List return flights if applicable
         if self.transaction_data['trip_type'] == 'return':
             message += "\nReturn flights:\n"
             for idx, flight in enumerate(self.transaction_data['return_flights'], start=1):
-                message += f"{idx}. Flight {flight['flight_id']} from {flight['departure_city']} to {flight['destination_city']} on {flight['departure_date']} at ${flight['price']}\n"
+                message += self.describe_flight(idx, flight)
+
+            if self.transaction_data.get('date_flexible'):
+                best = cheapest_round_trip(
+                    self.transaction_data['available_flights'],
+                    self.transaction_data['return_flights']
+                )
+                if best:
+                    outbound, inbound, total = best
+                    departure_idx = self.transaction_data['available_flights'].index(outbound) + 1
+                    return_idx = self.transaction_data['return_flights'].index(inbound) + 1
+                    message += f"\nCheapest combination: departure {departure_idx} with return {return_idx} for ${total:.2f}\n"
 
         message += "\nPlease select your departure flight by entering the number."
         return message
 
+    def describe_flight(self, idx, flight):
+        """Format one numbered flight (or connecting itinerary) option."""
+        description = f"{idx}. Flight {flight['flight_id']} from {flight['departure_city']} to {flight['destination_city']} on {flight['departure_date']} at ${flight['price']}"
+        if flight.get('legs'):
+            stops = ', '.join(leg['destination_city'] for leg in flight['legs'][:-1])
+            description += f" (via {stops}, arriving {flight['arrival_date']})"
+        return description + "\n"
+
     def process_flight_selection(self, user_input):
         """Process the user's flight selection."""
         # Handle proceed/cancel commands first
         if user_input.lower() == 'proceed':
             return self.finalize_booking()
         if user_input.lower() == 'cancel':
-            self.in_transaction = False
-            self.transaction_data = {}
+            self.end_transaction()
             return "Booking cancelled."
 
         try:
@@ -359,7 +721,14 @@ class Chatbot:
             # Handle departure flight selection
             if not self.transaction_data.get('selected_departure_flight'):
                 if 0 < selection <= len(self.transaction_data['available_flights']):
-                    self.transaction_data['selected_departure_flight'] = self.transaction_data['available_flights'][selection - 1]
+                    flight = self.transaction_data['available_flights'][selection - 1]
+                    if (self.transaction_data['trip_type'] == 'return' and
+                            not any(self.returns_after(flight, return_flight)
+                                    for return_flight in self.transaction_data.get('return_flights', []))):
+                        return "None of the return flights leave after that flight arrives. Please choose an earlier departure flight."
+                    if not self.hold_seat(flight):
+                        return "Sorry, that flight has just sold out. Please choose another flight."
+                    self.transaction_data['selected_departure_flight'] = flight
                     if self.transaction_data['trip_type'] == 'return':
                         return_flights = self.transaction_data.get('return_flights', [])
                         if return_flights:
@@ -371,13 +740,41 @@ class Chatbot:
             if (self.transaction_data['trip_type'] == 'return' and 
                 not self.transaction_data.get('selected_return_flight')):
                 if 0 < selection <= len(self.transaction_data['return_flights']):
-                    self.transaction_data['selected_return_flight'] = self.transaction_data['return_flights'][selection - 1]
+                    flight = self.transaction_data['return_flights'][selection - 1]
+                    if not self.returns_after(self.transaction_data['selected_departure_flight'], flight):
+                        return "That return flight leaves before your departure flight arrives. Please choose a later return flight."
+                    if not self.hold_seat(flight):
+                        return "Sorry, that flight has just sold out. Please choose another flight."
+                    self.transaction_data['selected_return_flight'] = flight
                     return self.present_confirmation_prompt()
                 return "Invalid flight number. Please try again."
                 
         except ValueError:
             return "Please enter a valid flight number."
 
+    def returns_after(self, outbound, return_flight):
+        """Check a return flight departs no earlier than the outbound arrives."""
+        return parse_date(return_flight['departure_date']) >= arrival_ordinal(outbound)
+
+    def hold_seat(self, flight):
+        """Hold a seat on every leg of a selected flight for this transaction."""
+        hold_id = self.reservations.hold(flight_leg_ids(flight))
+        if hold_id is None:
+            return False
+        self.transaction_data.setdefault('holds', []).append(hold_id)
+        return True
+
+    def end_transaction(self):
+        """Leave the booking flow, releasing any seats still on hold."""
+        for hold_id in (self.transaction_data or {}).get('holds', []):
+            self.reservations.release(hold_id)
+        self.in_transaction = False
+        self.transaction_data = {}
+
+    def is_bookable(self, flight):
+        """Check every leg of a flight has a seat that is neither sold nor held."""
+        return all(self.reservations.available(flight_id) > 0 for flight_id in flight_leg_ids(flight))
+
     def present_confirmation_prompt(self):
         """Present booking confirmation prompt."""
         if self.transaction_data['trip_type'] == 'single' or self.transaction_data.get('selected_return_flight'):
@@ -395,13 +792,21 @@ class Chatbot:
                 return "Return flight not selected. Please select a return flight."
             total_price += self.transaction_data['selected_return_flight']['price']
             
-        # Update available seats
-        self.transaction_data['selected_departure_flight']['available_seats'] -= 1
-        if self.transaction_data.get('selected_return_flight'):
-            self.transaction_data['selected_return_flight']['available_seats'] -= 1
-        
-        self.in_transaction = False
-        self.transaction_data = {}
+        # Book every leg of the selected flights as one durable booking
+        flight_ids = []
+        for flight in (self.transaction_data['selected_departure_flight'],
+                       self.transaction_data.get('selected_return_flight')):
+            if flight:
+                flight_ids.extend(flight_leg_ids(flight))
+        with self.metrics.timer('chatbot_stage_seconds', stage='booking_commit'):
+            booking_id = self.reservations.commit(
+                flight_ids,
+                self.transaction_data.get('holds', []),
+                details={'name': self.user_name, 'price': total_price}
+            )
+        self.end_transaction()
+        if not booking_id:
+            return "I'm sorry, your seat could not be confirmed because the flight is now full. Please start your booking again."
         return f"Your booking is confirmed. The total price is ${total_price:.2f}. Thank you for choosing Skynet Travel Agency!"
 
 
@@ -416,42 +821,154 @@ class Chatbot:
         return None, None
 
 
-    def handle_user_input(self, user_input):
-        """Process user input and generate response."""
-        user_input_lower = user_input.lower()
+    def route_batch(self, inputs):
+        """Return the routing decision ('intent' and, for questions no intent
+        claims, 'qa_match') for each input.
+
+        Decisions depend only on the input and the models, so they are cached
+        by model generation, QA index version and normalised input;
+        responses are still rendered per message, keeping names and times
+        fresh. Misses are scored together in one vectorizer call and matrix
+        product each.
+        """
+        with self.pin_models():
+            return self._route_batch(inputs, self.current_models())
+
+    def _route_batch(self, inputs, models):
+        routings = [None] * len(inputs)
+        misses = {}
+        for index, user_input in enumerate(inputs):
+            key = (models.generation, models.qa_index.version if models.qa_index else 0, routing_key(user_input))
+            routings[index] = self.routing_cache.get(key)
+            if routings[index] is None:
+                misses.setdefault(key, []).append(index)
+
+        if misses:
+            keys = list(misses)
+            originals = [inputs[misses[key][0]] for key in keys]
+            with self.metrics.timer('chatbot_stage_seconds', stage='intent'):
+                intents = get_intents(
+                    originals,
+                    self.intent_vectorizer,
+                    self.intent_vectors,
+                    self.intent_mapping
+                )
+            computed = [{'intent': intent} for intent in intents]
+            questions = [
+                position for position, intent in enumerate(intents)
+                if not (intent[0] and intent[1] >= INTENT_THRESHOLD) and is_question(originals[position])
+            ]
+            if questions:
+                with self.metrics.timer('chatbot_stage_seconds', stage='qa_match'):
+                    matches = self.find_best_qa_matches([originals[position] for position in questions])
+                for position, match in zip(questions, matches):
+                    computed[position]['qa_match'] = match
+            for key, routing in zip(keys, computed):
+                self.routing_cache.set(key, routing)
+                for index in misses[key]:
+                    routings[index] = routing
+        return routings
+
+    def route(self, user_input):
+        """Single-input version of route_batch."""
+        return self.route_batch([user_input])[0]
+
+    def handle_batch(self, inputs, sessions, defer_external=False):
+        """Process one message for each session, routing all messages together.
+
+        Messages that may need intent or QA scoring are routed in one
+        route_batch call, then each is dispatched against its own session.
+        With defer_external, responses needing a network lookup are returned
+        as ExternalCall objects for the caller to resolve off this thread.
+        """
+        self._local.defer_external = defer_external
+        try:
+            with self.pin_models():
+                return self._handle_batch(inputs, sessions)
+        finally:
+            self._local.defer_external = False
+
+    def _handle_batch(self, inputs, sessions):
+        routings = [{} for _ in inputs]
+        try:
+            # Only messages _respond will route: names, bookings and the
+            # transaction flow never need the models.
+            pending = [
+                index for index, session in enumerate(sessions)
+                if session.user_name and not session.in_transaction and not detect_booking(inputs[index])
+            ]
+            if pending:
+                with self.metrics.timer('chatbot_stage_seconds', stage='route_batch'):
+                    batch_routings = self.route_batch([inputs[index] for index in pending])
+                for index, routing in zip(pending, batch_routings):
+                    routings[index] = routing
+        except Exception as e:
+            # Each message is routed on its own below instead.
+            self.metrics.increment('chatbot_errors_total', stage='route_batch')
+            print(f"Error routing batch: {str(e)}")
+
+        # A failing message gets an error response of its own; the others
+        # (whose sessions may already have changed) are still answered.
+        responses = []
+        for user_input, session, routing in zip(inputs, sessions, routings):
+            try:
+                responses.append(self.handle_user_input(user_input, session, routing))
+            except Exception as e:
+                print(f"Error handling message: {str(e)}")
+                responses.append(ERROR_RESPONSE)
+        return responses
+
+    def handle_user_input(self, user_input, session=None, routing=None):
+        """Process user input and generate response.
+
+        `session` holds the conversation state to use (the default session if
+        omitted); `routing` may carry the route_batch decision for the input.
+        """
+        if session is not None:
+            with self.bind_session(session):
+                return self.handle_user_input(user_input, routing=routing)
+        if not getattr(self._local, 'pinning', False):
+            with self.pin_models():
+                return self.handle_user_input(user_input, routing=routing)
+
+        start = time.perf_counter()
+        try:
+            outcome, intent, response = self._respond(user_input, routing or {})
+        except Exception:
+            self.metrics.increment('chatbot_errors_total', stage='handle_user_input')
+            raise
+        self.metrics.observe('chatbot_stage_seconds', time.perf_counter() - start, stage='total')
+        self.metrics.increment('chatbot_messages_total', intent=intent or 'none', outcome=outcome)
+        return response
+
+    def _external(self, service, function, coroutine, argument):
+        """Make a network lookup now, or hand it back as an ExternalCall
+        inside handle_batch(..., defer_external=True)."""
+        call = ExternalCall(self.metrics, service, function, coroutine, argument)
+        return call if getattr(self._local, 'defer_external', False) else call()
+
+    def _respond(self, user_input, routing):
+        """Return (outcome, intent, response) for one message; outcome and
+        intent label the chatbot_messages_total counter."""
+        unknown = "I'm not sure how to answer that. Could you rephrase your question?"
 
         if not self.user_name:
-            extracted_name = extract_name(user_input)
+            with self.metrics.timer('chatbot_stage_seconds', stage='extract_name'):
+                extracted_name = extract_name(user_input)
             if extracted_name:
                 self.user_name = extracted_name
-                return f"Nice to meet you, {self.user_name}! How can I help you today?\n(to end the conversation write 'quit' or 'exit')"
+                return 'name', None, f"Nice to meet you, {self.user_name}! How can I help you today?\n(to end the conversation write 'quit' or 'exit')"
             else:
-                return "I didn't quite catch your name. Could you tell me again?"
+                return 'name_retry', None, "I didn't quite catch your name. Could you tell me again?"
 
         if self.in_transaction:
             # Handle transaction flow
-            return self.handle_transaction(user_input)
+            with self.metrics.timer('chatbot_stage_seconds', stage='transaction'):
+                return 'transaction', 'booking', self.handle_transaction(user_input)
         else:
-            booking_patterns = [
-            r'\bbook (?:a )?(?:flight|ticket)\b',
-            r'\bneed (?:a )?(?:flight|ticket)\b',
-            r'\bget (?:me )?(?:a )?(?:flight|ticket)\b',
-            r'\bfind (?:me )?(?:a )?(?:flight|ticket)\b',
-            r'\blooking for (?:a )?(?:flight|ticket)\b',
-            r'\bi want to (?:fly|travel)(?: to| from)?\b',
-            r'\bi want (?:a )?(?:flight|ticket)\b',
-            r'\b(?:flight|ticket) from\b',
-            r'\b(?:flight|ticket) to\b',
-            r'\bfly (?:to|from)\b',
-            r'\btravel (?:to|from)\b',
-            r'\bneed to go to\b',
-        ]
-            booking_intent_detected = False
-            for pattern in booking_patterns:
-                if re.search(pattern, user_input_lower):
-                    booking_intent_detected = True
-                    break
-            if booking_intent_detected:
+            with self.metrics.timer('chatbot_stage_seconds', stage='detect_booking'):
+                booking = detect_booking(user_input)
+            if booking:
                 self.in_transaction = True
                 self.transaction_data = {
                     'departure_city': None,
@@ -462,59 +979,52 @@ class Chatbot:
                     'date_flexible': None,
                     'flight_options_provided': False,
                 }
-                return "Welcome to Skynet Travel Agency! How can I assist you today?\n(write 'city' to 'city' to book a flight(if city's name is more than one word, please use '-' to separate the words.))\nTo quit write 'quit transaction'"
+                return 'booking_started', 'booking', "Welcome to Skynet Travel Agency! How can I assist you today?\n(write 'city' to 'city' to book a flight(if city's name is more than one word, please use '-' to separate the words.))\nTo quit write 'quit transaction'"
 
-            intent, score = get_intent(
-                user_input,
-                self.intent_vectorizer,
-                self.intent_vectors,
-                self.intent_mapping
-            )
+            if 'intent' not in routing:
+                with self.metrics.timer('chatbot_stage_seconds', stage='route'):
+                    routing = self.route(user_input)
+            intent, score = routing['intent']
 
-            if intent and score >= 0.7:
+            if intent and score >= INTENT_THRESHOLD:
                 # Handle recognized intents
                 if intent == 'greeting':
-                    now_nottingam = self.get_current_time_in_nottingham()
-                    time_of_day = self.get_time_of_day(now_nottingam)
+                    now_nottingam = get_current_time_in_nottingham()
+                    time_of_day = get_time_of_day(now_nottingam)
                     response = random.choice(self.greeting_responses)
-                    return response.format(name=self.user_name, time_of_day=time_of_day)
+                    return 'intent', intent, response.format(name=self.user_name, time_of_day=time_of_day)
                 elif intent == 'farewell':
                     response = random.choice(self.farewell_responses)
-                    return response.format(name=self.user_name)
+                    return 'intent', intent, response.format(name=self.user_name)
                 elif intent == 'capabilities':
-                    return random.choice(self.capabilities_response)
+                    return 'intent', intent, random.choice(self.capabilities_response)
                 elif intent == 'time_query':
                     # Handle time in a specific location
                     location = extract_time_location(user_input)
                     if location:
-                        return get_time_in_location(location)
+                        return 'intent', intent, self._external(
+                            'time', get_time_in_location, aget_time_in_location, location)
                     else:
-                        return self.handle_time_query()
+                        return 'intent', intent, self.handle_time_query()
                 elif intent == 'date_query':
-                    return self.handle_date_query()
+                    return 'intent', intent, self.handle_date_query()
                 elif intent == 'name_query':
-                    return f"Your name is {self.user_name}!"
+                    return 'intent', intent, f"Your name is {self.user_name}!"
                 elif intent == 'weather_query':
                     location = extract_location(user_input)
-                    return get_weather(location)
+                    return 'intent', intent, self._external('weather', get_weather, aget_weather, location)
                 elif intent == 'small_talk':
-                    return random.choice(self.small_talk_responses)
+                    return 'intent', intent, random.choice(self.small_talk_responses)
                 else:
-                    return "I'm not sure how to answer that. Could you rephrase your question?"
+                    return 'unhandled_intent', intent, unknown
             else:
-                # Check if input is a question
-                is_question = (
-                    user_input.strip().endswith('?') or
-                    user_input.strip().lower().startswith(
-                        ('what', 'how', 'why', 'where', 'when', 'who')
-                    )
-                )
-
-                if is_question:
+                if is_question(user_input):
                     # Try to find a QA match
-                    best_qa_match = self.find_best_qa_match(user_input)
+                    best_qa_match = routing.get('qa_match')
                     if best_qa_match:
-                        return self.qa_pairs[best_qa_match]
+                        answer = self.qa_pairs[best_qa_match]
+                        source = self.qa_source(best_qa_match)
+                        return 'qa', None, f"{answer} (Source: {source})" if source else answer
 
             # If all else fails
-            return "I'm not sure how to answer that. Could you rephrase your question?"
+            return 'fallback', None, unknown
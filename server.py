@@ -0,0 +1,459 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import queue
+import signal
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from chatbot import Chatbot, ExternalCall
+from utils.flight_inventory import TICKETS_PATH
+from utils.hot_reload import ModelWatcher, model_sources
+from utils.metrics import StatsdExporter, prometheus_text
+from utils.session import SessionStore
+from utils.worker_pool import WorkerPool
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+MAX_BODY_SIZE = 64 * 1024
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+class Overloaded(Exception):
+    """Raised when the scoring queue is full."""
+
+class MessageBatcher:
+    """Queue messages and score them in batches on a background executor.
+
+    The queue is bounded: when it is full, submit() raises Overloaded so the
+    caller can shed load instead of letting latency grow without limit. All
+    batches run on a single executor thread, so the shared models and ticket
+    inventory are only ever touched by one batch at a time.
+    """
+
+    def __init__(self, chatbot, max_pending=1024, max_batch=64, idle_timeout=1800, executor=None):
+        self.chatbot = chatbot
+        self.sessions = SessionStore(idle_timeout=idle_timeout)
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='scoring')
+        self._worker = None
+        self._external = set()
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def reload(self):
+        """Swap in freshly built models; batches keep running meanwhile."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.chatbot.reload_models(background=False))
+
+    async def metrics(self):
+        """Return a snapshot of the chatbot's metrics."""
+        return self.chatbot.metrics.snapshot()
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, session_id, message):
+        """Queue one message for a session and wait for its response."""
+        session, _ = self.sessions.get_or_create(session_id)
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((session, message, future))
+        except asyncio.QueueFull:
+            raise Overloaded()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            sessions = [session for session, _, _ in batch]
+            messages = [message for _, message, _ in batch]
+            try:
+                responses = await loop.run_in_executor(
+                    self.executor, self.chatbot.handle_batch, messages, sessions, True)
+            except Exception as e:
+                self.chatbot.metrics.increment('chatbot_errors_total', stage='batch')
+                print(f"Error handling batch: {str(e)}")
+                responses = [e] * len(batch)
+
+            for (_, _, future), response in zip(batch, responses):
+                if future.done():
+                    continue
+                if isinstance(response, ExternalCall):
+                    # Weather and time lookups run on the weather client's
+                    # pool; the scoring thread moves on to the next batch.
+                    task = asyncio.create_task(self._resolve(response, future))
+                    self._external.add(task)
+                    task.add_done_callback(self._external.discard)
+                elif isinstance(response, Exception):
+                    future.set_exception(response)
+                else:
+                    future.set_result(response)
+
+            if self.queue.empty():
+                self.sessions.expire()
+
+    @staticmethod
+    async def _resolve(call, future):
+        try:
+            response = await call.resolve()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(response)
+
+class PooledBackend:
+    """Adapt a WorkerPool to the MessageBatcher interface."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.stop)
+
+    async def reload(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.reload)
+
+    async def metrics(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self.pool.metrics)
+
+    async def submit(self, session_id, message):
+        try:
+            future = self.pool.submit(session_id, message)
+        except queue.Full:
+            raise Overloaded()
+        return await asyncio.wrap_future(future)
+
+class ChatServer:
+    """Asyncio HTTP and WebSocket front-end sharing one Chatbot.
+
+    Endpoints:
+      POST /sessions                  -> {"session_id", "response"}
+      POST /chat {session_id, message} -> {"session_id", "response"}
+      GET  /ws?session_id=...         -> WebSocket, one text frame per message
+      GET  /health
+      GET  /metrics                   -> Prometheus text (all workers merged)
+    """
+
+    def __init__(self, backend, welcome_message):
+        self.backend = backend
+        self.welcome_message = welcome_message
+        self._locks = {}
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.backend.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.backend.stop()
+
+    async def chat(self, session_id, message):
+        """Answer one message for a session, creating the session if needed.
+
+        Messages for the same session are answered strictly in order.
+        """
+        # [lock, number of requests holding or waiting for it]
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self.backend.submit(session_id, message)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[session_id]
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                url = urlsplit(target)
+
+                if url.path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self._handle_websocket(reader, writer, headers, parse_qs(url.query))
+                    break
+
+                status, payload = await self._route(method, url.path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            await write_response(writer, 400, {'error': str(e)}, keep_alive=False)
+        except Exception as e:
+            print(f"Error handling request: {str(e)}")
+            try:
+                await write_response(writer, 500, {'error': 'internal error'}, keep_alive=False)
+            except (ConnectionError, RuntimeError):
+                pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/metrics':
+            return 200, prometheus_text(await self.backend.metrics())
+        if path not in ('/sessions', '/chat'):
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 405, {'error': 'method not allowed'}
+
+        if path == '/sessions':
+            return 200, {'session_id': uuid.uuid4().hex, 'response': self.welcome_message}
+
+        try:
+            data = json.loads(body or b'{}')
+            message = data['message']
+            session_id = str(data.get('session_id') or uuid.uuid4().hex)
+        except (ValueError, KeyError, TypeError):
+            return 400, {'error': "expected JSON with a 'message' field"}
+
+        try:
+            response = await self.chat(session_id, str(message))
+        except Overloaded:
+            return 503, {'error': 'server busy, please retry'}
+        return 200, {'session_id': session_id, 'response': response}
+
+    async def _handle_websocket(self, reader, writer, headers, query):
+        key = headers.get('sec-websocket-key')
+        if not key:
+            await write_response(writer, 400, {'error': 'missing Sec-WebSocket-Key'}, keep_alive=False)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + accept.encode() + b'\r\n\r\n')
+
+        session_id = query.get('session_id', [None])[0]
+        if not session_id:
+            session_id = uuid.uuid4().hex
+            await write_frame(writer, 0x1, self.welcome_message.encode('utf-8'))
+
+        while True:
+            frame = await read_message(reader, writer)
+            if frame is None:
+                break
+            try:
+                response = await self.chat(session_id, frame.decode('utf-8', 'replace'))
+            except Overloaded:
+                response = 'Server busy, please retry.'
+            await write_frame(writer, 0x1, response.encode('utf-8'))
+
+async def read_request(reader):
+    """Read one HTTP/1.1 request, returning (method, target, headers, body)."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise ValueError('malformed request line')
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0) or 0)
+    if length > MAX_BODY_SIZE:
+        raise ValueError('request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+async def write_response(writer, status, payload, keep_alive=True):
+    """Send payload as JSON, or as plain text if it is a string."""
+    if isinstance(payload, str):
+        body = payload.encode('utf-8')
+        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body = json.dumps(payload).encode('utf-8')
+        content_type = 'application/json'
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+    )
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    writer.write(head.encode('latin-1') + b'\r\n' + body)
+    await writer.drain()
+
+async def write_frame(writer, opcode, payload):
+    """Write one unmasked (server-to-client) WebSocket frame."""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 1 << 16:
+        header.append(126)
+        header += length.to_bytes(2, 'big')
+    else:
+        header.append(127)
+        header += length.to_bytes(8, 'big')
+    writer.write(bytes(header) + payload)
+    await writer.drain()
+
+async def read_message(reader, writer):
+    """Read one complete WebSocket data message, answering control frames.
+
+    Returns the payload bytes, or None once the connection is closing.
+    """
+    message = bytearray()
+    while True:
+        first, second = await reader.readexactly(2)
+        fin, opcode = first & 0x80, first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), 'big')
+        elif length == 127:
+            length = int.from_bytes(await reader.readexactly(8), 'big')
+        if length > MAX_BODY_SIZE:
+            await write_frame(writer, 0x8, (1009).to_bytes(2, 'big'))
+            return None
+        mask = await reader.readexactly(4) if second & 0x80 else b'\x00' * 4
+        payload = bytes(
+            byte ^ mask[i % 4] for i, byte in enumerate(await reader.readexactly(length)))
+
+        if opcode == 0x8:
+            await write_frame(writer, 0x8, payload[:2])
+            return None
+        if opcode == 0x9:
+            await write_frame(writer, 0xA, payload)
+            continue
+        if opcode == 0xA:
+            continue
+
+        message += payload
+        if fin:
+            return bytes(message)
+
+async def push_metrics(backend, exporter, interval):
+    """Send the backend's metrics to StatsD every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            exporter.flush(await backend.metrics())
+        except Exception as e:
+            print(f"Error exporting metrics: {str(e)}")
+
+async def serve(host, port, backend, welcome_message, watch_interval=0, statsd=None, metrics_interval=10):
+    server = ChatServer(backend, welcome_message)
+    await server.start(host, port)
+    print(f"Chatbot server listening on http://{host}:{port}")
+
+    loop = asyncio.get_running_loop()
+    reloading = asyncio.Lock()
+
+    async def reload_models():
+        async with reloading:
+            print("Reloading models")
+            await backend.reload()
+
+    def schedule_reload():
+        asyncio.run_coroutine_threadsafe(reload_models(), loop)
+
+    # `kill -HUP <pid>` reloads the QA dataset and intents.
+    if hasattr(signal, 'SIGHUP'):
+        loop.add_signal_handler(signal.SIGHUP, schedule_reload)
+    watcher = ModelWatcher(model_sources(), schedule_reload, watch_interval).start() if watch_interval else None
+    exporter = StatsdExporter(*statsd) if statsd else None
+    pusher = asyncio.create_task(push_metrics(backend, exporter, metrics_interval)) if exporter else None
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if watcher:
+            watcher.stop()
+        if pusher:
+            pusher.cancel()
+            exporter.close()
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the chatbot over HTTP and WebSocket.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-pending', type=int, default=1024,
+                        help="messages queued for scoring before requests get 503")
+    parser.add_argument('--max-batch', type=int, default=64,
+                        help="largest number of messages scored together")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="pre-fork this many worker processes (0 scores in-process)")
+    parser.add_argument('--watch-models', type=float, default=0, metavar='SECONDS',
+                        help="poll the QA dataset and intents for changes and hot-reload them")
+    parser.add_argument('--tickets', default=TICKETS_PATH,
+                        help="tickets CSV, or a SQLite inventory (.db) shared by all workers")
+    parser.add_argument('--statsd', metavar='HOST:PORT',
+                        help="also push metrics to this StatsD server over UDP")
+    parser.add_argument('--metrics-interval', type=float, default=10, metavar='SECONDS',
+                        help="how often metrics are pushed to StatsD")
+    args = parser.parse_args()
+    statsd = None
+    if args.statsd:
+        host, _, port = args.statsd.rpartition(':')
+        statsd = (host or '127.0.0.1', int(port))
+
+    chatbot = Chatbot(args.tickets)
+    if args.workers:
+        # Fork before the event loop and the pool's reader threads exist.
+        # The journal writer thread Chatbot() started is not inherited; each
+        # child starts its own from the Journal fork hook.
+        try:
+            pool = WorkerPool(chatbot, args.workers, max_pending=args.max_pending,
+                              max_batch=args.max_batch)
+        except ValueError as e:
+            parser.error(str(e))
+        pool.start()
+        backend = PooledBackend(pool)
+    else:
+        backend = MessageBatcher(chatbot, max_pending=args.max_pending, max_batch=args.max_batch)
+
+    try:
+        asyncio.run(serve(args.host, args.port, backend, chatbot.get_welcome_message(),
+                          args.watch_models, statsd, args.metrics_interval))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+# tests/conftest.py
+
+import pytest
+
+from chatbot import Chatbot
+
+@pytest.fixture(scope='session')
+def snapshot_dir(tmp_path_factory):
+    """A model snapshot shared by the tests, built on first use."""
+    return str(tmp_path_factory.mktemp('model_snapshot'))
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'bookings.journal')
+
+@pytest.fixture
+def bot(journal_path, snapshot_dir):
+    """A Chatbot whose bookings and model snapshot stay out of the repo."""
+    bot = Chatbot(journal_path=journal_path, snapshot_dir=snapshot_dir)
+    yield bot
+    bot.reservations.journal.close()
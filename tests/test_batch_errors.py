@@ -0,0 +1,29 @@
+# tests/test_batch_errors.py
+
+import chatbot
+from chatbot import ERROR_RESPONSE
+from utils.session import Session
+
+def named_session(name):
+    session = Session()
+    session.user_name = name
+    return session
+
+def test_poisoned_message_fails_alone(monkeypatch, bot):
+    detect_booking = chatbot.detect_booking
+
+    def poisoned(user_input):
+        if user_input == 'poison':
+            raise RuntimeError('poisoned message')
+        return detect_booking(user_input)
+
+    monkeypatch.setattr(chatbot, 'detect_booking', poisoned)
+    sessions = [named_session('Ann'), named_session('Bob'), named_session('Cid')]
+
+    responses = bot.handle_batch(['book a flight', 'poison', 'what is my name'], sessions)
+
+    assert responses[0].startswith('Welcome to Skynet Travel Agency!')
+    assert sessions[0].in_transaction
+    assert responses[1] == ERROR_RESPONSE
+    assert not sessions[1].in_transaction
+    assert responses[2] == 'Your name is Cid!'
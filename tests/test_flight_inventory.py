@@ -0,0 +1,54 @@
+# tests/test_flight_inventory.py
+
+import threading
+
+from utils.flight_inventory import FlightInventory, format_date, parse_date
+
+START = parse_date('01/12/2030')
+CITIES = ['London', 'Paris', 'Rome', 'Madrid', 'Berlin']
+
+def flight(flight_id):
+    return {
+        'flight_id': flight_id,
+        'departure_city': CITIES[flight_id % 5],
+        'destination_city': CITIES[(flight_id // 5) % 5],
+        'departure_date': format_date(START + flight_id % 30),
+        'available_seats': 10,
+        'price': 100.0,
+    }
+
+def test_lookups_during_compaction_see_consistent_columns():
+    inventory = FlightInventory(flight(flight_id) for flight_id in range(1000))
+    stop = threading.Event()
+    errors = []
+
+    def search():
+        while not stop.is_set():
+            for flight_id in range(0, 25):
+                query = flight(flight_id)
+                for found in inventory.find(
+                        query['departure_city'], query['destination_city'], query['departure_date']):
+                    if (found['departure_city'], found['destination_city'], found['departure_date']) != (
+                            query['departure_city'], query['destination_city'], query['departure_date']):
+                        errors.append(found)
+
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for flight_id in range(1000, 6000):
+        inventory.add(flight(flight_id))
+        if flight_id % 50 == 0:
+            inventory._compact()
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert len(inventory) == 6000
+
+def test_decrement_is_kept_across_compaction():
+    inventory = FlightInventory([flight(1)])
+    inventory.decrement_seats(1)
+    inventory.add(flight(2))
+    assert inventory.seats(1) == 9
+    assert inventory.seats(2) == 10
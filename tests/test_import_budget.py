@@ -0,0 +1,10 @@
+# tests/test_import_budget.py
+
+import pytest
+
+from benchmarks.import_budget import MODULES, measure
+
+@pytest.mark.parametrize('module', MODULES)
+def test_entry_point_does_not_load_deferred_dependencies(module):
+    _, loaded = measure(module, runs=1)
+    assert loaded == []
@@ -0,0 +1,23 @@
+# tests/test_lazy_models.py
+
+from utils.session import Session
+
+def test_name_and_booking_messages_do_not_load_models(bot):
+    session = Session()
+    for message in ['my name is Ann', 'book a flight', 'from London to Paris', 'single']:
+        bot.handle_batch([message], [session])
+        bot.handle_user_input(message, Session())
+    assert bot._models is None
+
+    bot.handle_batch(['how are glacier caves formed?'], [session])
+    assert bot._models is None
+    session.in_transaction = False
+    bot.handle_batch(['how are glacier caves formed?'], [session])
+    assert bot._models is not None
+
+def test_models_stay_pinned_for_the_rest_of_a_message(bot):
+    with bot.pin_models():
+        first = bot.current_models()
+        bot.reload_models(background=False)
+        assert bot.current_models() is first
+    assert bot.current_models() is not first
@@ -0,0 +1,27 @@
+# tests/test_metrics.py
+
+from utils.metrics import Metrics
+
+def record_everything(metrics):
+    metrics.increment('requests_total')
+    metrics.set_counter('cache_requests_total', 5, result='hit')
+    metrics.set_gauge('cache_entries', 3)
+    metrics.observe('stage_seconds', 0.01)
+    with metrics.timer('stage_seconds'):
+        pass
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.add_collector(record_everything)
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {}
+    assert snapshot['gauges'] == {}
+    assert snapshot['histograms'] == {}
+
+def test_enabled_metrics_record_every_kind():
+    metrics = Metrics()
+    metrics.add_collector(record_everything)
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'][('cache_requests_total', (('result', 'hit'),))] == 5
+    assert snapshot['gauges'][('cache_entries', ())] == 3
+    assert sum(snapshot['histograms'][('stage_seconds', ())][:-1]) == 2
@@ -0,0 +1,30 @@
+# tests/test_reservations.py
+
+import os
+
+import pytest
+
+from utils import reservations
+from utils.reservations import Journal
+
+def test_closed_journals_are_not_restarted_after_fork(tmp_path):
+    closed = [Journal(str(tmp_path / f'{index}.journal')) for index in range(10)]
+    for journal in closed:
+        journal.close()
+    live = Journal(str(tmp_path / 'live.journal'))
+    assert live in reservations._journals
+    assert not any(journal in reservations._journals for journal in closed)
+    live.close()
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_forked_child_can_append(tmp_path):
+    journal = Journal(str(tmp_path / 'bookings.journal'))
+    pid = os.fork()
+    if pid == 0:
+        try:
+            journal.append({'type': 'booking', 'flights': [1]})
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    journal.close()
+    assert list(Journal.replay(journal.path)) == [{'type': 'booking', 'flights': [1]}]
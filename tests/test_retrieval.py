@@ -0,0 +1,47 @@
+# tests/test_retrieval.py
+
+from utils.data_loader import build_qa_vectorizer
+from utils.retrieval import QAIndex
+
+QUESTIONS = [
+    'how are glacier caves formed',
+    'what is the capital of france',
+    'how do glaciers move',
+    'who wrote pride and prejudice',
+    'what causes ocean tides',
+]
+
+def build_index(drift_threshold):
+    questions = list(QUESTIONS)
+    vectorizer = build_qa_vectorizer()
+    vectors = vectorizer.fit_transform(questions)
+    return QAIndex(vectorizer, questions, vectors, drift_threshold=drift_threshold)
+
+def test_removed_question_stays_removed_after_reweight():
+    # A zero threshold re-weights the whole index on every edit.
+    index = build_index(drift_threshold=0.0)
+    removed = index.remove('how are glacier caves formed')
+    assert removed == 0
+    assert all(doc_id != removed for doc_id, _ in index.search('glacier caves', k=5))
+
+    index.add(['where do glacier caves form in summer'])
+    assert index._state.unpurged == frozenset()
+    assert all(doc_id != removed for doc_id, _ in index.search('glacier caves', k=5))
+    assert all(doc_id != removed for doc_id, _ in index.search_batch(['glacier caves'], k=5)[0])
+
+    # Another rebuild must not bring it back either.
+    index.add(['why is the sky blue'])
+    assert all(doc_id != removed for doc_id, _ in index.search('glacier caves', k=5))
+    assert len(index) == len(QUESTIONS) + 1
+
+def test_removed_question_not_counted_in_document_frequencies():
+    index = build_index(drift_threshold=0.0)
+    index.remove('how are glacier caves formed')
+    index.add(['why is the sky blue'])
+    caves = index.vectorizer.vocabulary_['caves']
+    assert index._state.df[caves] == 0
+
+def test_search_without_reweight_skips_tombstones():
+    index = build_index(drift_threshold=float('inf'))
+    index.remove('how are glacier caves formed')
+    assert all(doc_id != 0 for doc_id, _ in index.search('glacier caves', k=5))
@@ -0,0 +1,43 @@
+# tests/test_round_trip.py
+
+from utils.flight_inventory import cheapest_round_trip
+from utils.route_planner import as_itinerary
+
+def flight(flight_id, departure_city, destination_city, departure_date, price):
+    return {
+        'flight_id': flight_id,
+        'departure_city': departure_city,
+        'destination_city': destination_city,
+        'departure_date': departure_date,
+        'available_seats': 10,
+        'price': price,
+    }
+
+# Leaves London on the 10th and, via Paris, reaches Rome on the 12th.
+CONNECTION = as_itinerary([
+    flight(1, 'London', 'Paris', '10/12/2030', 50.0),
+    flight(2, 'Paris', 'Rome', '12/12/2030', 50.0),
+])
+EARLY_RETURN = flight(3, 'Rome', 'London', '11/12/2030', 10.0)
+LATE_RETURN = flight(4, 'Rome', 'London', '12/12/2030', 80.0)
+
+def test_cheapest_round_trip_returns_after_the_last_leg_arrives():
+    outbound, inbound, total = cheapest_round_trip([CONNECTION], [EARLY_RETURN, LATE_RETURN])
+    assert inbound is LATE_RETURN
+    assert total == 180.0
+
+def test_return_before_outbound_arrival_is_rejected(bot):
+    bot.in_transaction = True
+    bot.transaction_data = {
+        'trip_type': 'return',
+        'date_flexible': True,
+        'available_flights': [CONNECTION],
+        'return_flights': [EARLY_RETURN, LATE_RETURN],
+        'selected_departure_flight': CONNECTION,
+        'awaiting_flight_selection': True,
+    }
+
+    response = bot.process_flight_selection('1')
+
+    assert response.startswith('That return flight leaves before')
+    assert 'selected_return_flight' not in bot.transaction_data
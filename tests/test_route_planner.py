@@ -0,0 +1,26 @@
+# tests/test_route_planner.py
+
+from utils.flight_inventory import FlightInventory
+from utils.route_planner import RoutePlanner
+
+def flight(flight_id, departure_city, destination_city, departure_date, price):
+    return {
+        'flight_id': flight_id,
+        'departure_city': departure_city,
+        'destination_city': destination_city,
+        'departure_date': departure_date,
+        'available_seats': 10,
+        'price': price,
+    }
+
+def test_fastest_ranks_by_trip_duration():
+    planner = RoutePlanner(FlightInventory([
+        # Leaves two days early and takes three days to arrive on the 11th.
+        flight(1, 'London', 'Paris', '08/12/2030', 50.0),
+        flight(2, 'Paris', 'Rome', '11/12/2030', 50.0),
+        # Leaves on the 10th and arrives on the 12th: one day shorter.
+        flight(3, 'London', 'Madrid', '10/12/2030', 50.0),
+        flight(4, 'Madrid', 'Rome', '12/12/2030', 50.0),
+    ]))
+    itineraries = planner.search('London', 'Rome', '10/12/2030', objective='fastest', window_days=2)
+    assert [itinerary['flight_id'] for itinerary in itineraries] == ['3+4', '1+2']
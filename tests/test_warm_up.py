@@ -0,0 +1,30 @@
+# tests/test_warm_up.py
+
+import subprocess
+import sys
+
+def run_fresh(script, journal_path, snapshot_dir):
+    """Run script in a fresh interpreter (so modules imported by other tests
+    do not count), after `bot = Chatbot(...)` with the test's paths."""
+    setup = (
+        "import sys\n"
+        "from chatbot import Chatbot\n"
+        f"bot = Chatbot(journal_path={journal_path!r}, snapshot_dir={snapshot_dir!r})\n"
+    )
+    subprocess.run([sys.executable, '-c', setup + script], check=True)
+
+def test_warm_up_loads_dateparser(journal_path, snapshot_dir):
+    run_fresh(
+        "assert 'dateparser' not in sys.modules\n"
+        "bot.warm_up()\n"
+        "assert 'dateparser' in sys.modules\n",
+        journal_path, snapshot_dir)
+
+def test_warm_up_routes_and_matches_questions(journal_path, snapshot_dir):
+    run_fresh(
+        "bot.warm_up()\n"
+        "assert bot._models is not None\n"
+        "assert bot.routing_cache.stats()['size'] == 2\n"
+        "histograms = bot.metrics.snapshot()['histograms']\n"
+        "assert ('chatbot_stage_seconds', (('stage', 'route_batch'),)) in histograms\n",
+        journal_path, snapshot_dir)
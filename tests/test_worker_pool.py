@@ -0,0 +1,63 @@
+# tests/test_worker_pool.py
+
+import itertools
+
+import pytest
+
+from chatbot import Chatbot
+from utils.sqlite_inventory import import_csv
+from utils.worker_pool import WorkerPool, worker_for
+
+LAST_SEAT = (
+    'flight_id,departure_city,destination_city,departure_date,available_seats,price\n'
+    '1,London,Paris,15/12/2030,1,150\n'
+)
+CONVERSATION = ['my name is Ann', 'book a flight', 'from London to Paris', 'single', '15/12/2030', '1']
+
+def one_seat_tickets(tmp_path):
+    path = tmp_path / 'tickets.csv'
+    path.write_text(LAST_SEAT)
+    return str(path)
+
+def test_workers_refuse_an_in_memory_inventory(tmp_path, journal_path, snapshot_dir):
+    bot = Chatbot(one_seat_tickets(tmp_path), journal_path=journal_path, snapshot_dir=snapshot_dir)
+    with pytest.raises(ValueError):
+        WorkerPool(bot, 2)
+    WorkerPool(bot, 1)
+    bot.reservations.journal.close()
+
+def test_last_seat_is_sold_once_across_workers(tmp_path, journal_path, snapshot_dir):
+    db_path = str(tmp_path / 'tickets.db')
+    assert import_csv(one_seat_tickets(tmp_path), db_path) == 1
+    bot = Chatbot(db_path, journal_path=journal_path, snapshot_dir=snapshot_dir)
+    pool = WorkerPool(bot, 2).start()
+    try:
+        # One session on each worker.
+        sessions = [next(f'session-{n}' for n in itertools.count() if worker_for(f'session-{n}', 2) == worker)
+                    for worker in range(2)]
+        for message in CONVERSATION:
+            for session_id in sessions:
+                pool.submit(session_id, message).result(timeout=30)
+        replies = [pool.submit(session_id, 'proceed').result(timeout=30) for session_id in sessions]
+    finally:
+        pool.stop()
+        bot.reservations.journal.close()
+
+    assert sum(reply.startswith('Your booking is confirmed') for reply in replies) == 1
+    assert bot.tickets.seats(1) == 0
+
+def test_workers_do_not_count_the_parents_warm_up(tmp_path, journal_path, snapshot_dir):
+    db_path = str(tmp_path / 'tickets.db')
+    import_csv(one_seat_tickets(tmp_path), db_path)
+    bot = Chatbot(db_path, journal_path=journal_path, snapshot_dir=snapshot_dir)
+    pool = WorkerPool(bot, 2).start()
+    try:
+        counters = pool.metrics()['counters']
+    finally:
+        pool.stop()
+        bot.reservations.journal.close()
+
+    assert bot.routing_cache.stats()['misses'] > 0
+    routing = {key: value for key, value in counters.items()
+               if key[0] == 'chatbot_cache_requests_total' and ('cache', 'routing') in key[1]}
+    assert routing and all(value == 0 for value in routing.values())
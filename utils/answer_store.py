@@ -0,0 +1,61 @@
+# utils/answer_store.py
+
+import mmap
+import os
+from collections.abc import Mapping
+
+class AnswerStore(Mapping):
+    """Read-mostly mapping from question to answer, with answers kept on disk.
+
+    Answers are stored back to back as UTF-8 in one file, located by an
+    (offset, length) row per question. Only the question -> position table
+    and the offsets stay in memory; the file is memory-mapped, so an answer
+    is paged in only when it is returned. Answers set at run time are kept
+    in memory and take precedence over the file.
+    """
+
+    def __init__(self, answers_file, positions, spans):
+        """answers_file: open binary file; positions: {question: row};
+        spans: (n, 2) int array of answer offsets and lengths."""
+        self._file = answers_file
+        size = os.fstat(answers_file.fileno()).st_size
+        self._data = mmap.mmap(answers_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._positions = positions
+        self.spans = spans
+        self._updates = {}
+        self._added = 0
+
+    @classmethod
+    def open(cls, path, questions, spans):
+        """Open an answers file written by load_qa_dataset()."""
+        positions = {question: position for position, question in enumerate(questions)}
+        return cls(open(path, 'rb'), positions, spans)
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __getitem__(self, question):
+        answer = self._updates.get(question)
+        if answer is not None:
+            return answer
+        offset, length = self.spans[self._positions[question]]
+        return self._data[int(offset):int(offset) + int(length)].decode('utf-8')
+
+    def __setitem__(self, question, answer):
+        if question not in self:
+            self._added += 1
+        self._updates[question] = answer
+
+    def __contains__(self, question):
+        return question in self._positions or question in self._updates
+
+    def __len__(self):
+        return len(self._positions) + self._added
+
+    def __iter__(self):
+        yield from self._positions
+        for question in list(self._updates):
+            if question not in self._positions:
+                yield question
@@ -1,14 +1,22 @@
 # utils/data_loader.py
 
 import csv
-from sklearn.feature_extraction.text import TfidfVectorizer
+import itertools
+import tempfile
+from array import array
 
-def load_qa_dataset():
-    """Load the QA dataset and vectorize questions."""
-    qa_pairs = {}
-    questions = []
-    qa_vectors = None
-    qa_vectorizer = TfidfVectorizer(
+import numpy as np
+
+from utils.answer_store import AnswerStore
+
+QA_DATASET_PATH = 'COMP3074-CW1-Dataset.csv'
+QA_CHUNK_ROWS = 10000
+
+def build_qa_vectorizer():
+    """Create the (unfitted) TF-IDF vectorizer used for QA matching."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(
         ngram_range=(1, 2),
         analyzer='word',
         max_features=10000,
@@ -16,16 +24,73 @@ def load_qa_dataset():
         stop_words='english'
     )
 
+def read_qa_chunks(dataset_path=QA_DATASET_PATH, chunk_rows=QA_CHUNK_ROWS):
+    """Yield the dataset's (lowercased question, answer, source document)
+    rows in lists of at most chunk_rows, reading the file as it goes."""
+    with open(dataset_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        while True:
+            chunk = [
+                (row['Question'].lower(), row['Answer'], row.get('Document') or None)
+                for row in itertools.islice(reader, chunk_rows)
+            ]
+            if not chunk:
+                return
+            yield chunk
+
+def load_qa_dataset(dataset_path=QA_DATASET_PATH, answers_path=None):
+    """Load the QA dataset and vectorize questions.
+
+    The CSV is read in chunks and each chunk's answers are appended to
+    `answers_path` (an anonymous temporary file by default), so memory holds
+    the questions, one answer offset each and the TF-IDF matrix rather than
+    every answer. qa_pairs is an AnswerStore reading answers back on demand.
+    As before, a repeated question keeps its first position and last answer.
+    sources holds the Document title of each question (None if missing).
+    """
+    qa_pairs = {}
+    questions = []
+    sources = []
+    qa_vectors = None
+    qa_vectorizer = build_qa_vectorizer()
+
+    answers_file = None
     try:
-        with open('COMP3074-CW1-Dataset.csv', 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                question = row['Question'].lower()
-                qa_pairs[question] = row['Answer']
-        questions = list(qa_pairs.keys())
+        answers_file = open(answers_path, 'w+b') if answers_path else tempfile.TemporaryFile()
+        positions = {}
+        titles = {}
+        offsets = array('q')
+        lengths = array('q')
+        end = 0
+        for chunk in read_qa_chunks(dataset_path):
+            encoded = []
+            for question, answer, source in chunk:
+                data = answer.encode('utf-8')
+                source = titles.setdefault(source, source)
+                position = positions.get(question)
+                if position is None:
+                    positions[question] = len(questions)
+                    questions.append(question)
+                    sources.append(source)
+                    offsets.append(end)
+                    lengths.append(len(data))
+                else:
+                    sources[position] = source
+                    offsets[position] = end
+                    lengths[position] = len(data)
+                encoded.append(data)
+                end += len(data)
+            answers_file.write(b''.join(encoded))
+        answers_file.flush()
+
         qa_vectors = qa_vectorizer.fit_transform(questions)
+        spans = np.column_stack((np.frombuffer(offsets, dtype=np.int64), np.frombuffer(lengths, dtype=np.int64)))
+        qa_pairs = AnswerStore(answers_file, positions, spans)
     except Exception as e:
         print(f"Error loading QA dataset: {str(e)}")
         qa_pairs = {}
+        qa_vectors = None
+        if answers_file is not None:
+            answers_file.close()
 
-    return qa_pairs, questions, qa_vectors, qa_vectorizer
+    return qa_pairs, questions, qa_vectors, qa_vectorizer, sources
@@ -0,0 +1,112 @@
+# utils/date_extraction.py
+
+import re
+from datetime import datetime, timedelta
+
+# dateparser is only asked when the fast path finds nothing, and then in
+# English only: language detection is most of its cost.
+SEARCH_LANGUAGES = ['en']
+SEARCH_SETTINGS = {'PREFER_DATES_FROM': 'future'}
+
+MONTHS = (
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december',
+)
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+MONTH = r'jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?'
+ORDINAL = r'(?:st|nd|rd|th)?'
+YEAR = r'(?:,?\s+(?P<{0}>\d{{4}}))?'
+
+DATE_PATTERN = re.compile(
+    r'\b(?:'
+    # 15/12/2024 or 15-12-2024 (day first, like the rest of the bot)
+    r'(?P<numeric_day>\d{1,2})[/-](?P<numeric_month>\d{1,2})[/-](?P<numeric_year>\d{4})'
+    # 2024-12-15
+    r'|(?P<iso_year>\d{4})-(?P<iso_month>\d{1,2})-(?P<iso_day>\d{1,2})'
+    # 15th of December 2024, 15 Dec
+    rf'|(?P<day_first>\d{{1,2}}){ORDINAL}\s+(?:of\s+)?(?P<day_first_month>{MONTH})\.?' + YEAR.format('day_first_year') +
+    # December 15th, 2024, Dec the 15th
+    rf'|(?P<month_first_month>{MONTH})\.?\s+(?:the\s+)?(?P<month_first>\d{{1,2}}){ORDINAL}' + YEAR.format('month_first_year') +
+    r'|(?P<relative>today|tomorrow)'
+    # next Friday, this Friday, Friday
+    rf'|(?:(?:next|this)\s+)?(?P<weekday>{"|".join(WEEKDAYS)})'
+    r')\b',
+    re.IGNORECASE)
+
+# Date-like text the fast path does not understand. If any is left over
+# next to a date it did parse, the whole input goes to dateparser instead,
+# so a partial parse never reorders or drops a date.
+LEFTOVER_PATTERN = re.compile(
+    r'\b(?:\d{1,2}(?:st|nd|rd|th)|\d{1,4}[/.-]\d{1,2}'
+    rf'|(?:{MONTH})\.?\s+\d|\d\s+(?:of\s+)?(?:{MONTH})\b'
+    r'|yesterday|tonight|weekend|fortnight|days?|weeks?|months?|years?)\b',
+    re.IGNORECASE)
+
+def _month_number(name):
+    return MONTHS.index(next(month for month in MONTHS if month.startswith(name.lower()[:3]))) + 1
+
+def _future_date(today, month, day, year):
+    """The date with an explicit year, else its next occurrence after today
+    (today's own date means next year, as dateparser reads it)."""
+    if year:
+        return datetime(int(year), month, day)
+    candidate = datetime(today.year, month, day)
+    return candidate if candidate > today else datetime(today.year + 1, month, day)
+
+def _parse(match, today):
+    groups = match.groupdict()
+    if groups['numeric_day']:
+        return datetime(int(groups['numeric_year']), int(groups['numeric_month']), int(groups['numeric_day']))
+    if groups['iso_year']:
+        return datetime(int(groups['iso_year']), int(groups['iso_month']), int(groups['iso_day']))
+    if groups['day_first']:
+        return _future_date(
+            today, _month_number(groups['day_first_month']), int(groups['day_first']), groups['day_first_year'])
+    if groups['month_first']:
+        return _future_date(
+            today, _month_number(groups['month_first_month']), int(groups['month_first']), groups['month_first_year'])
+    if groups['relative']:
+        return today + timedelta(days=1 if groups['relative'].lower() == 'tomorrow' else 0)
+    # A weekday is its next occurrence after today, as dateparser reads it.
+    days_ahead = (WEEKDAYS.index(groups['weekday'].lower()) - today.weekday() - 1) % 7 + 1
+    return today + timedelta(days=days_ahead)
+
+def fast_search_dates(text, now=None):
+    """Find the common date forms in text without dateparser.
+
+    Returns [(matched text, datetime)] in order of appearance, [] if there
+    are none, or None if the text holds a date the fast path cannot read
+    (or an impossible one), in which case dateparser should decide.
+    """
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    results = []
+    leftover = []
+    position = 0
+    for match in DATE_PATTERN.finditer(text):
+        try:
+            results.append((match.group(0), _parse(match, today)))
+        except ValueError:
+            return None
+        leftover.append(text[position:match.start()])
+        position = match.end()
+    if results:
+        leftover.append(text[position:])
+        if LEFTOVER_PATTERN.search(' '.join(leftover)):
+            return None
+    return results
+
+def search_dates(text, now=None):
+    """Return [(matched text, datetime)] for the dates in text, or None,
+    preferring future dates like dateparser's PREFER_DATES_FROM='future'.
+
+    Common forms are parsed directly; only text the fast path finds no
+    date in is handed to dateparser.search.search_dates.
+    """
+    dates = fast_search_dates(text, now)
+    if dates:
+        return dates
+    from dateparser.search import search_dates as dateparser_search_dates
+
+    settings = SEARCH_SETTINGS if now is None else dict(SEARCH_SETTINGS, RELATIVE_BASE=now)
+    return dateparser_search_dates(text, languages=SEARCH_LANGUAGES, settings=settings)
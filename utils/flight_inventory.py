@@ -0,0 +1,339 @@
+# utils/flight_inventory.py
+
+import bisect
+import csv
+import threading
+from array import array
+from collections import namedtuple
+from datetime import date, datetime
+
+import numpy as np
+
+TICKETS_PATH = 'tickets.csv'
+DATE_FORMAT = '%d/%m/%Y'
+
+# One consistent version of a FlightInventory's columns and route index.
+_Columns = namedtuple('_Columns', [
+    'ids', 'origin_names', 'destination_names', 'days', 'seats', 'prices', 'id_order', 'routes',
+])
+
+def normalize_city(name):
+    """Canonical form used for matching: 'New-York ' -> 'new york'."""
+    return ' '.join(name.replace('-', ' ').split()).casefold()
+
+def parse_date(value):
+    """Return the ordinal of a 'dd/mm/yyyy' string, date or datetime, or None."""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        day, month, year = value.split('/')
+        return date(int(year), int(month), int(day)).toordinal()
+    except (AttributeError, ValueError):
+        return None
+
+def arrival_ordinal(flight):
+    """Ordinal of the date a flight, or the last leg of an itinerary, arrives."""
+    return parse_date(flight.get('arrival_date', flight['departure_date']))
+
+def format_date(ordinal):
+    """Inverse of parse_date: ordinal -> 'dd/mm/yyyy'."""
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+class FlightInventory:
+    """Flights stored column by column and indexed by route, sorted by date.
+
+    Ids, seats, prices and date ordinals are NumPy arrays and city names are
+    interned to small integer ids, so a flight costs a few dozen bytes
+    instead of a dict of strings. Rows are kept sorted by (departure,
+    destination, date): a route is a contiguous slice, a date range within
+    it a binary search, and availability a vectorised mask. Flight dicts are
+    only materialised for the rows a lookup returns, so changing one does
+    not change the inventory; use decrement_seats() or book().
+
+    Flights added after a lookup are buffered and merged into the columns
+    on the next lookup. `version` counts the flights added (seat changes
+    leave it alone), so indexes over the routes can tell they are stale. Seat counts live in this process only (see
+    SqliteInventory for a store shared between processes).
+    """
+
+    durable = False
+
+    def __init__(self, flights=()):
+        self._lock = threading.Lock()
+        self._pending = []
+        # Ids in the order they were added; version is its length.
+        self._added_ids = array('q')
+        self.version = 0
+        # Interned display names (as written in the data) and matching keys.
+        self._name_ids = {}
+        self._names = []
+        self._city_ids = {}
+        self._date_cache = {}
+        self._date_strings = {}
+        # The columns and route index are replaced together by _compact, so
+        # a lookup reading self._columns once sees one consistent version.
+        self._columns = _Columns(
+            ids=np.empty(0, dtype=np.int64),
+            origin_names=np.empty(0, dtype=np.int32),
+            destination_names=np.empty(0, dtype=np.int32),
+            days=np.empty(0, dtype=np.int32),
+            seats=np.empty(0, dtype=np.int32),
+            prices=np.empty(0, dtype=np.float64),
+            id_order=np.empty(0, dtype=np.int64),
+            routes={},
+        )
+        for flight in flights:
+            self.add(flight)
+
+    @classmethod
+    def from_csv(cls, path=TICKETS_PATH):
+        """Load a tickets.csv-style file, streaming it row by row."""
+        inventory = cls()
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as csvfile:
+                reader = csv.reader(csvfile)
+                header = next(reader)
+                for values in reader:
+                    row = dict(zip(header, values))
+                    # Convert numerical fields
+                    row['flight_id'] = int(row['flight_id'])
+                    row['available_seats'] = int(row['available_seats'])
+                    row['price'] = float(row['price'])
+                    inventory.add(row)
+        except Exception as e:
+            print(f"Error loading ticket dataset: {e}")
+        inventory._compact()
+        return inventory
+
+    def __len__(self):
+        return len(self._columns.ids) + len(self._pending)
+
+    def __iter__(self):
+        columns = self._compacted()
+        for row in range(len(columns.ids)):
+            yield self._flight(columns, row)
+
+    def add(self, flight):
+        """Add a flight dict (flight_id, departure_city, destination_city,
+        departure_date, available_seats, price)."""
+        departure_date = flight['departure_date']
+        ordinal = self._date_cache.get(departure_date)
+        if ordinal is None:
+            ordinal = self._date_cache[departure_date] = parse_date(departure_date)
+            if ordinal is None:
+                return
+        self._pending.append((
+            flight['flight_id'],
+            self._intern(flight['departure_city']),
+            self._intern(flight['destination_city']),
+            ordinal,
+            flight['available_seats'],
+            flight['price'],
+        ))
+        self._added_ids.append(flight['flight_id'])
+        self.version += 1
+
+    def _intern(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            self._city_ids.setdefault(normalize_city(name), len(self._city_ids))
+        return name_id
+
+    def _compact(self):
+        """Merge buffered flights into the columns and rebuild the route index."""
+        if not self._pending:
+            return
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            columns = self._columns
+            ids, origins, destinations, days, seats, prices = zip(*pending)
+            ids = np.concatenate([columns.ids, np.array(ids, dtype=np.int64)])
+            origin_names = np.concatenate([columns.origin_names, np.array(origins, dtype=np.int32)])
+            destination_names = np.concatenate([columns.destination_names, np.array(destinations, dtype=np.int32)])
+            days = np.concatenate([columns.days, np.array(days, dtype=np.int32)])
+            seats = np.concatenate([columns.seats, np.array(seats, dtype=np.int32)])
+            prices = np.concatenate([columns.prices, np.array(prices, dtype=np.float64)])
+
+            # Route keys are the interned ids of the normalised city names.
+            name_keys = np.array([self._city_ids[normalize_city(name)] for name in self._names], dtype=np.int32)
+            origin_keys = name_keys[origin_names]
+            destination_keys = name_keys[destination_names]
+            order = np.lexsort((days, destination_keys, origin_keys))
+            ids = ids[order]
+
+            route_keys = origin_keys[order].astype(np.int64) * len(self._city_ids) + destination_keys[order]
+            starts = np.flatnonzero(np.r_[True, route_keys[1:] != route_keys[:-1]]) if len(route_keys) else []
+            ends = list(starts[1:]) + [len(route_keys)]
+            routes = {}
+            for route_start, route_end in zip(starts, ends):
+                key = divmod(int(route_keys[route_start]), len(self._city_ids))
+                routes[key] = (int(route_start), int(route_end))
+
+            self._columns = _Columns(
+                ids=ids,
+                origin_names=origin_names[order],
+                destination_names=destination_names[order],
+                days=days[order],
+                seats=seats[order],
+                prices=prices[order],
+                id_order=np.argsort(ids, kind='stable'),
+                routes=routes,
+            )
+
+    def _compacted(self):
+        """Merge buffered flights, then return the current columns."""
+        self._compact()
+        return self._columns
+
+    def _flight(self, columns, row):
+        """Materialise one row as a flight dict."""
+        day = int(columns.days[row])
+        departure_date = self._date_strings.get(day)
+        if departure_date is None:
+            departure_date = self._date_strings[day] = format_date(day)
+        return {
+            'flight_id': int(columns.ids[row]),
+            'departure_city': self._names[columns.origin_names[row]],
+            'destination_city': self._names[columns.destination_names[row]],
+            'departure_date': departure_date,
+            'available_seats': int(columns.seats[row]),
+            'price': float(columns.prices[row]),
+        }
+
+    @staticmethod
+    def _row(columns, flight_id):
+        position = np.searchsorted(columns.ids, flight_id, sorter=columns.id_order)
+        if position < len(columns.ids):
+            row = columns.id_order[position]
+            if columns.ids[row] == flight_id:
+                return row
+        return None
+
+    def flights_added_since(self, version):
+        """Return (current version, flights added after `version`)."""
+        current = self.version
+        return current, [self.get(flight_id) for flight_id in self._added_ids[version:current]]
+
+    def get(self, flight_id):
+        """Return the flight with this id, or None."""
+        columns = self._compacted()
+        row = self._row(columns, flight_id)
+        return None if row is None else self._flight(columns, row)
+
+    def seats(self, flight_id):
+        """Return the available seats on a flight (0 if unknown)."""
+        columns = self._compacted()
+        row = self._row(columns, flight_id)
+        return 0 if row is None else int(columns.seats[row])
+
+    def decrement_seats(self, flight_id, count=1):
+        """Take `count` seats off a flight (negative to give seats back)."""
+        self._compact()
+        # Under the lock, so a compaction copying the seats cannot lose it.
+        with self._lock:
+            columns = self._columns
+            row = self._row(columns, flight_id)
+            if row is None:
+                return False
+            columns.seats[row] -= count
+        return True
+
+    def book(self, flight_ids):
+        """Take one seat on every flight if all have one free; return success."""
+        needed = {}
+        for flight_id in flight_ids:
+            needed[flight_id] = needed.get(flight_id, 0) + 1
+        if any(self.seats(flight_id) < count for flight_id, count in needed.items()):
+            return False
+        for flight_id, count in needed.items():
+            self.decrement_seats(flight_id, count)
+        return True
+
+    def routes(self):
+        """Return the (departure, destination) keys of every route."""
+        columns = self._compacted()
+        keys = list(self._city_ids)
+        return [(keys[origin], keys[destination]) for origin, destination in columns.routes]
+
+    def _route_rows(self, columns, departure_city, destination_city, start, end):
+        """Row range [low, high) of a route departing between start and end."""
+        origin = self._city_ids.get(normalize_city(departure_city))
+        destination = self._city_ids.get(normalize_city(destination_city))
+        route = columns.routes.get((origin, destination))
+        if route is None:
+            return 0, 0
+        days = columns.days[route[0]:route[1]]
+        low = int(np.searchsorted(days, start, side='left'))
+        high = int(np.searchsorted(days, end, side='right'))
+        return route[0] + low, route[0] + high
+
+    def find_range(self, departure_city, destination_city, start, end, include_full=False):
+        """Return flights on a route departing between start and end inclusive.
+
+        start/end may be 'dd/mm/yyyy' strings, dates or ordinals. Flights
+        without available seats are skipped unless include_full is set.
+        """
+        start = start if isinstance(start, int) else parse_date(start)
+        end = end if isinstance(end, int) else parse_date(end)
+        if start is None or end is None:
+            return []
+        columns = self._compacted()
+        low, high = self._route_rows(columns, departure_city, destination_city, start, end)
+        rows = np.arange(low, high)
+        if not include_full:
+            rows = rows[columns.seats[low:high] > 0]
+        return [self._flight(columns, row) for row in rows]
+
+    def find(self, departure_city, destination_city, travel_date, include_full=False):
+        """Return flights on a route departing on one date."""
+        return self.find_range(
+            departure_city, destination_city, travel_date, travel_date, include_full)
+
+    def find_flexible(self, departure_city, destination_city, travel_date, window_days, limit=None):
+        """Return available flights within +/- window_days of a date, cheapest
+        first (ties go to the date closest to the requested one)."""
+        center = travel_date if isinstance(travel_date, int) else parse_date(travel_date)
+        if center is None:
+            return []
+        columns = self._compacted()
+        low, high = self._route_rows(
+            columns, departure_city, destination_city, center - window_days, center + window_days)
+        rows = np.arange(low, high)[columns.seats[low:high] > 0]
+        distance = np.abs(columns.days[rows] - center)
+        rows = rows[np.lexsort((distance, columns.prices[rows]))]
+        return [self._flight(columns, row) for row in (rows[:limit] if limit else rows)]
+
+def cheapest_round_trip(outbound_flights, return_flights):
+    """Return the (outbound, return, total_price) pair with the lowest combined
+    price whose return departs no earlier than the outbound arrives, or None.
+
+    Returns are sorted by date once and a suffix minimum of their prices is
+    kept, so each outbound flight is paired by one binary search.
+    """
+    if not outbound_flights or not return_flights:
+        return None
+
+    inbound = sorted(return_flights, key=lambda flight: parse_date(flight['departure_date']))
+    inbound_dates = [parse_date(flight['departure_date']) for flight in inbound]
+    cheapest_from = [None] * len(inbound)
+    best = None
+    for index in range(len(inbound) - 1, -1, -1):
+        if best is None or inbound[index]['price'] < best['price']:
+            best = inbound[index]
+        cheapest_from[index] = best
+
+    result = None
+    for outbound in outbound_flights:
+        index = bisect.bisect_left(inbound_dates, arrival_ordinal(outbound))
+        if index == len(inbound):
+            continue
+        total = outbound['price'] + cheapest_from[index]['price']
+        if result is None or total < result[2]:
+            result = (outbound, cheapest_from[index], total)
+    return result
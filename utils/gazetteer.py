@@ -0,0 +1,102 @@
+# utils/gazetteer.py
+
+import bisect
+import csv
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+from difflib import get_close_matches
+
+GAZETTEER_PATH = 'world_cities.csv'
+
+Place = namedtuple('Place', ['city', 'country', 'latitude', 'longitude', 'timezone', 'population'])
+
+def normalize_place(name):
+    """Fold accents, case, punctuation and spacing: 'São-Paulo!' -> 'sao paulo'."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r"[^a-z0-9]+", ' ', name.lower())
+    return name.strip()
+
+class Gazetteer:
+    """Offline city -> (lat, lon, timezone) index built from a bundled CSV.
+
+    Names are normalised once at load time into a hash index (exact lookups)
+    and a sorted key list (prefix lookups such as 'new york' -> 'new york
+    city'). Misspellings fall back to difflib fuzzy matching within the keys
+    sharing the query's first letter. When several cities share a name the
+    most populous wins, unless a country is given ('London, Canada').
+    """
+
+    def __init__(self, places=()):
+        self._by_name = {}
+        for place in sorted(places, key=lambda place: -place.population):
+            self._by_name.setdefault(normalize_place(place.city), []).append(place)
+        self._countries = {normalize_place(place.country) for places in self._by_name.values() for place in places}
+        self._keys = sorted(self._by_name)
+        self._buckets = {}
+        for key in self._keys:
+            self._buckets.setdefault(key[:1], []).append(key)
+
+    def __len__(self):
+        return sum(len(places) for places in self._by_name.values())
+
+    @classmethod
+    def from_csv(cls, path=GAZETTEER_PATH):
+        places = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    places.append(Place(
+                        row['city'],
+                        row['country'],
+                        float(row['latitude']),
+                        float(row['longitude']),
+                        row['timezone'],
+                        int(row['population']),
+                    ))
+        except Exception as e:
+            print(f"Error loading gazetteer: {str(e)}")
+        return cls(places)
+
+    def lookup(self, location, fuzzy=True):
+        """Return the best matching Place for a free-text location, or None."""
+        name, country = normalize_place(location), None
+        if ',' in location:
+            city_part, _, country_part = location.rpartition(',')
+            if normalize_place(country_part) in self._countries:
+                name, country = normalize_place(city_part), normalize_place(country_part)
+        if not name:
+            return None
+
+        candidates = self._by_name.get(name) or self._prefix_matches(name)
+        if not candidates and fuzzy:
+            close = get_close_matches(name, self._buckets.get(name[:1], []), n=1, cutoff=0.85)
+            candidates = self._by_name[close[0]] if close else []
+
+        if country:
+            candidates = [place for place in candidates if normalize_place(place.country) == country]
+        return candidates[0] if candidates else None
+
+    def _prefix_matches(self, name):
+        """Places whose name starts with `name` followed by a word boundary."""
+        prefix = name + ' '
+        start = bisect.bisect_left(self._keys, prefix)
+        places = []
+        for key in self._keys[start:]:
+            if not key.startswith(prefix):
+                break
+            places.extend(self._by_name[key])
+        return sorted(places, key=lambda place: -place.population)
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer():
+    """Return the process-wide Gazetteer, loading it on first use."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer.from_csv()
+        return _gazetteer
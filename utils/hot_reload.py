@@ -0,0 +1,59 @@
+# utils/hot_reload.py
+
+import os
+import threading
+
+from utils import intent_processor
+from utils.data_loader import QA_DATASET_PATH
+
+WATCH_INTERVAL = 2.0
+
+def model_sources(dataset_path=QA_DATASET_PATH):
+    """Files the QA and intent models are built from."""
+    return [dataset_path, intent_processor.__file__]
+
+class ModelWatcher:
+    """Poll source files and call `on_change` when any of them changes.
+
+    Uses modification time and size, so it needs nothing beyond the standard
+    library. `on_change` runs on the watcher thread; a change seen while it
+    is still running is picked up on the next poll.
+    """
+
+    def __init__(self, paths, on_change, interval=WATCH_INTERVAL):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._state = self._stat()
+
+    def _stat(self):
+        state = {}
+        for path in self.paths:
+            try:
+                info = os.stat(path)
+                state[path] = (info.st_mtime_ns, info.st_size)
+            except OSError:
+                state[path] = None
+        return state
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            state = self._stat()
+            if state != self._state:
+                self._state = state
+                try:
+                    self.on_change()
+                except Exception as e:
+                    print(f"Error reloading models: {str(e)}")
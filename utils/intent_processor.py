@@ -1,11 +1,59 @@
 
 import re
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-def initialize_intents():
-    """Initialize intents with example phrases."""
+from utils.patterns import PatternMatcher
+
+BOOKING_PATTERNS = [
+    r'\bbook (?:a )?(?:flight|ticket)\b',
+    r'\bneed (?:a )?(?:flight|ticket)\b',
+    r'\bget (?:me )?(?:a )?(?:flight|ticket)\b',
+    r'\bfind (?:me )?(?:a )?(?:flight|ticket)\b',
+    r'\blooking for (?:a )?(?:flight|ticket)\b',
+    r'\bi want to (?:fly|travel)(?: to| from)?\b',
+    r'\bi want (?:a )?(?:flight|ticket)\b',
+    r'\b(?:flight|ticket) from\b',
+    r'\b(?:flight|ticket) to\b',
+    r'\bfly (?:to|from)\b',
+    r'\btravel (?:to|from)\b',
+    r'\bneed to go to\b',
+]
+
+NAME_PATTERNS = [
+    r"(?:my name is|i am|i'm|call me) ([A-Za-z\s]+)",
+    r"([A-Za-z\s]+) is my name",
+    r"^([A-Za-z]+)$",
+    r"name: ([A-Za-z\s]+)",
+    r"name is ([A-Za-z\s]+)",
+]
+
+LOCATION_PATTERNS = [
+    r"weather (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
+    r"weather of (.+?)(?:\?|$| please| now| today)",
+    r"temperature (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
+    r"how'?s the weather (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
+    r"what'?s the weather (?:in|at|for) (.+?)(?:\?|$| please| now| today)"
+]
+
+TIME_LOCATION_PATTERNS = [
+    r"time (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
+    r"what'?s the time (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
+    r"current time (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
+    r"time of (.+?)(?:\?|$| please| now| today)",
+    r"tell me the time (?:in|at|for) (.+?)(?:\?|$| please| now| today)"
+]
+
+# Each list is compiled into a single alternation; ordered lists keep the
+# first-listed-pattern-wins behaviour of looping over them.
+ENTITY_MATCHER = PatternMatcher([
+    ('name', NAME_PATTERNS, True),
+    ('booking', BOOKING_PATTERNS, False),
+    ('location', LOCATION_PATTERNS, True),
+    ('time_location', TIME_LOCATION_PATTERNS, True),
+], re.IGNORECASE)
+
+def get_intent_definitions():
+    """Return the intent example phrases and canned responses."""
     intents = {
         'greeting': [
             'hi', 'hello', 'hey', 'good morning', 'good afternoon',
@@ -66,7 +114,19 @@ def initialize_intents():
         "I'm just a bot, but I'm doing great!"
     ]
 
-    intent_vectorizer = TfidfVectorizer(
+    return (
+        intents,
+        capabilities_response,
+        small_talk_responses,
+        greeting_responses,
+        farewell_responses
+    )
+
+def build_intent_vectorizer():
+    """Create the (unfitted) TF-IDF vectorizer used for intent matching."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(
         ngram_range=(1, 3),
         analyzer='char_wb',
         max_features=5000,
@@ -74,6 +134,18 @@ def initialize_intents():
         strip_accents='unicode'
     )
 
+def initialize_intents():
+    """Initialize intents with example phrases."""
+    (
+        intents,
+        capabilities_response,
+        small_talk_responses,
+        greeting_responses,
+        farewell_responses
+    ) = get_intent_definitions()
+
+    intent_vectorizer = build_intent_vectorizer()
+
     all_phrases = []
     intent_mapping = []
 
@@ -97,6 +169,8 @@ def initialize_intents():
 
 def get_intent(user_input, intent_vectorizer, intent_vectors, intent_mapping, threshold=0.4):
     """Determine intent using similarity matching."""
+    from sklearn.metrics.pairwise import cosine_similarity
+
     user_input = user_input.lower().strip()
 
     try:
@@ -114,50 +188,48 @@ def get_intent(user_input, intent_vectorizer, intent_vectors, intent_mapping, th
 
     return None, 0.0
 
+def get_intents(user_inputs, intent_vectorizer, intent_vectors, intent_mapping, threshold=0.4):
+    """Batch version of get_intent: one transform and one product for all inputs."""
+    if not user_inputs:
+        return []
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    try:
+        user_vectors = intent_vectorizer.transform(
+            [user_input.lower().strip() for user_input in user_inputs])
+        similarities = cosine_similarity(user_vectors, intent_vectors)
+
+        best_match_indices = np.argmax(similarities, axis=1)
+        best_match_scores = similarities[np.arange(len(user_inputs)), best_match_indices]
+
+        return [
+            (intent_mapping[index], score) if score >= threshold else (None, 0.0)
+            for index, score in zip(best_match_indices, best_match_scores)
+        ]
+
+    except Exception as e:
+        print(f"Error in intent matching: {str(e)}")
+
+    return [(None, 0.0)] * len(user_inputs)
+
 def extract_name(user_input):
     """Extract name from user input."""
-    patterns = [
-        r"(?:my name is|i am|i'm|call me) ([A-Za-z\s]+)",
-        r"([A-Za-z\s]+) is my name",
-        r"^([A-Za-z]+)$",
-        r"name: ([A-Za-z\s]+)",
-        r"name is ([A-Za-z\s]+)",
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, user_input, re.IGNORECASE)
-        if match:
-            name = match.group(1).strip()
-            return name.title()
+    match = ENTITY_MATCHER.search('name', user_input)
+    if match:
+        name = match.captures[0].strip()
+        return name.title()
     return None
 
+def detect_booking(user_input):
+    """Return the PatternMatch of the booking phrase in user input, or None."""
+    return ENTITY_MATCHER.search('booking', user_input)
+
 def extract_location(user_input):
     """Extract location from weather-related queries."""
-    patterns = [
-        r"weather (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
-        r"weather of (.+?)(?:\?|$| please| now| today)",
-        r"temperature (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
-        r"how'?s the weather (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
-        r"what'?s the weather (?:in|at|for) (.+?)(?:\?|$| please| now| today)"
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, user_input, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-    return None
+    match = ENTITY_MATCHER.search('location', user_input)
+    return match.captures[0].strip() if match else None
 
 def extract_time_location(user_input):
     """Extract location from time-related queries."""
-    patterns = [
-        r"time (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
-        r"what'?s the time (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
-        r"current time (?:in|at|for) (.+?)(?:\?|$| please| now| today)",
-        r"time of (.+?)(?:\?|$| please| now| today)",
-        r"tell me the time (?:in|at|for) (.+?)(?:\?|$| please| now| today)"
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, user_input, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-    return None
+    match = ENTITY_MATCHER.search('time_location', user_input)
+    return match.captures[0].strip() if match else None
@@ -0,0 +1,279 @@
+# utils/metrics.py
+
+import bisect
+import re
+import socket
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Ratios computed from counters at export time, so they stay correct after
+# the snapshots of several worker processes are merged:
+# name -> (counter, label, label value counted as a hit).
+RATIOS = {
+    'chatbot_cache_hit_ratio': ('chatbot_cache_requests_total', 'result', 'hit'),
+}
+
+STATSD_PACKET_SIZE = 1432
+
+def _series(name, labels):
+    """Key of one series: the name and its labels in a canonical order."""
+    items = tuple(labels.items())
+    return (name, tuple(sorted(items)) if len(items) > 1 else items)
+
+class _Timer:
+    """Context manager recording its duration in a histogram."""
+
+    __slots__ = ('metrics', 'key', 'start')
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """Counters, gauges and latency histograms for one process.
+
+    Recording is an addition under a lock, cheap enough to leave on. Each
+    series is a metric name plus keyword labels, e.g.
+    observe('chatbot_stage_seconds', 0.002, stage='route'). Collectors
+    registered with add_collector() run before each snapshot, to copy in
+    values kept elsewhere (such as cache hit counts). snapshot() returns
+    plain dicts that can be pickled, merged (merge_snapshots) and rendered
+    as Prometheus text or StatsD lines.
+    """
+
+    def __init__(self, enabled=True, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._gauges = {}
+        # key -> [count per bucket..., count above the last bucket, sum]
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        """Add value to a counter."""
+        if not self.enabled:
+            return
+        key = _series(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_counter(self, name, value, **labels):
+        """Set a counter to a running total kept elsewhere (for collectors)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[_series(name, labels)] = value
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[_series(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a latency histogram."""
+        if self.enabled:
+            self._observe(_series(name, labels), seconds)
+
+    def _observe(self, key, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def timer(self, name, **labels):
+        """Context manager timing its block into the histogram `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, _series(name, labels))
+
+    def reset(self):
+        """Drop every recorded value (collectors stay registered)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def add_collector(self, collector):
+        """Call collector(metrics) before every snapshot."""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """Return the current values as plain, picklable dicts."""
+        for collector in list(self._collectors):
+            try:
+                collector(self)
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+        with self._lock:
+            return {
+                'buckets': self.buckets,
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'histograms': {key: list(values) for key, values in self._histograms.items()},
+            }
+
+    def prometheus_text(self):
+        return prometheus_text(self.snapshot())
+
+def merge_snapshots(snapshots):
+    """Sum snapshots (e.g. one per worker process) into one."""
+    merged = {'buckets': LATENCY_BUCKETS, 'counters': {}, 'gauges': {}, 'histograms': {}}
+    for snapshot in snapshots:
+        merged['buckets'] = snapshot['buckets']
+        for kind in ('counters', 'gauges'):
+            for key, value in snapshot[kind].items():
+                merged[kind][key] = merged[kind].get(key, 0) + value
+        for key, values in snapshot['histograms'].items():
+            total = merged['histograms'].get(key)
+            merged['histograms'][key] = values[:] if total is None else [a + b for a, b in zip(total, values)]
+    return merged
+
+def _ratios(counters):
+    """Evaluate RATIOS: {(name, labels): hits / total}."""
+    totals = {}
+    for (name, labels), value in counters.items():
+        for ratio, (counter, label, hit_value) in RATIOS.items():
+            if name != counter:
+                continue
+            rest = tuple(item for item in labels if item[0] != label)
+            hits, total = totals.get((ratio, rest), (0, 0))
+            totals[(ratio, rest)] = (hits + (value if (label, hit_value) in labels else 0), total + value)
+    return {key: hits / total if total else 0.0 for key, (hits, total) in totals.items()}
+
+def _by_name(series):
+    grouped = {}
+    for (name, labels), value in sorted(series.items(), key=lambda item: item[0]):
+        grouped.setdefault(name, []).append((labels, value))
+    return grouped
+
+def _prometheus_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    escape = lambda value: str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in items) + '}'
+
+def prometheus_text(snapshot):
+    """Render a snapshot in the Prometheus text exposition format."""
+    lines = []
+    for kind, series in (('counter', snapshot['counters']), ('gauge', snapshot['gauges']),
+                         ('gauge', _ratios(snapshot['counters']))):
+        for name, values in _by_name(series).items():
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{_prometheus_labels(labels)} {value}' for labels, value in values)
+
+    bounds = [repr(float(bound)) for bound in snapshot['buckets']] + ['+Inf']
+    for name, values in _by_name(snapshot['histograms']).items():
+        lines.append(f'# TYPE {name} histogram')
+        for labels, histogram in values:
+            cumulative = 0
+            for bound, count in zip(bounds, histogram):
+                cumulative += count
+                lines.append(f'{name}_bucket{_prometheus_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_prometheus_labels(labels)} {histogram[-1]}')
+            lines.append(f'{name}_count{_prometheus_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+def _statsd_name(prefix, name, labels):
+    parts = [prefix, name] + [re.sub(r'[^A-Za-z0-9_-]+', '_', str(value)) for _, value in labels]
+    return '.'.join(part for part in parts if part)
+
+def _bucket_quantile(buckets, counts, quantile):
+    """Upper bound (in seconds) of the bucket holding the given quantile."""
+    target = quantile * sum(counts)
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return buckets[-1]
+
+def statsd_lines(snapshot, previous=None, prefix=''):
+    """Render a snapshot as StatsD lines, with label values folded into the
+    dotted name. Counters and histogram counts are sent as deltas since
+    `previous`; histograms also get the mean and (bucket-resolution) p95
+    latency of that interval in milliseconds, as gauges."""
+    previous = previous or {'counters': {}, 'histograms': {}}
+    lines = []
+    for key, value in sorted(snapshot['counters'].items()):
+        delta = value - previous['counters'].get(key, 0)
+        # A counter that went down was reset (e.g. a restarted worker).
+        delta = value if delta < 0 else delta
+        if delta:
+            lines.append(f'{_statsd_name(prefix, *key)}:{delta}|c')
+    for key, value in sorted(list(snapshot['gauges'].items()) + list(_ratios(snapshot['counters']).items())):
+        lines.append(f'{_statsd_name(prefix, *key)}:{value:g}|g')
+    for key, histogram in sorted(snapshot['histograms'].items()):
+        before = previous['histograms'].get(key)
+        if before and before[-1] <= histogram[-1]:
+            histogram = [now - then for now, then in zip(histogram, before)]
+        counts = histogram[:-1]
+        count = sum(counts)
+        if not count:
+            continue
+        name = _statsd_name(prefix, *key)
+        lines.append(f'{name}.count:{count}|c')
+        lines.append(f'{name}.mean_ms:{histogram[-1] / count * 1000:.3f}|g')
+        lines.append(f'{name}.p95_ms:{_bucket_quantile(snapshot["buckets"], counts, 0.95) * 1000:g}|g')
+    return lines
+
+class StatsdExporter:
+    """Send snapshots to a StatsD server over UDP, as deltas since the last flush."""
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix=''):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._previous = None
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def flush(self, snapshot):
+        lines = statsd_lines(snapshot, self._previous, self.prefix)
+        self._previous = snapshot
+        packet = b''
+        for line in lines:
+            line = line.encode('utf-8')
+            if packet and len(packet) + len(line) + 1 > STATSD_PACKET_SIZE:
+                self._send(packet)
+                packet = b''
+            packet = packet + b'\n' + line if packet else line
+        if packet:
+            self._send(packet)
+        return len(lines)
+
+    def _send(self, packet):
+        try:
+            self._socket.sendto(packet, self.address)
+        except OSError as e:
+            print(f"Error sending metrics: {str(e)}")
+
+    def close(self):
+        self._socket.close()
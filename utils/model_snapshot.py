@@ -0,0 +1,203 @@
+# utils/model_snapshot.py
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import sklearn
+from scipy.sparse import csr_matrix
+
+from utils import intent_processor
+from utils.answer_store import AnswerStore
+from utils.data_loader import QA_DATASET_PATH, build_qa_vectorizer, load_qa_dataset
+
+SNAPSHOT_VERSION = 3
+SNAPSHOT_DIR = 'model_snapshot'
+MANIFEST_FILE = 'manifest.json'
+ANSWERS_FILE = 'answers.bin'
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def intents_sha256(intents):
+    """Return a digest of the intent example phrases."""
+    payload = json.dumps(intents, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+def vectorizer_fingerprint(vectorizer):
+    """Return a stable description of a vectorizer's configuration."""
+    return json.dumps(vectorizer.get_params(), sort_keys=True, default=repr)
+
+def _expected_manifest(dataset_path, intents):
+    """Return the manifest fields a snapshot must match to be reusable."""
+    return {
+        'version': SNAPSHOT_VERSION,
+        'sklearn_version': sklearn.__version__,
+        'dataset_sha256': file_sha256(dataset_path),
+        'intents_sha256': intents_sha256(intents),
+        'qa_vectorizer': vectorizer_fingerprint(build_qa_vectorizer()),
+        'intent_vectorizer': vectorizer_fingerprint(intent_processor.build_intent_vectorizer()),
+    }
+
+def _save_matrix(directory, prefix, matrix):
+    """Write a CSR matrix as three flat .npy arrays."""
+    matrix = csr_matrix(matrix)
+    np.save(os.path.join(directory, f'{prefix}_data.npy'), matrix.data)
+    np.save(os.path.join(directory, f'{prefix}_indices.npy'), matrix.indices)
+    np.save(os.path.join(directory, f'{prefix}_indptr.npy'), matrix.indptr)
+    return list(matrix.shape)
+
+def _load_matrix(directory, prefix, shape):
+    """Memory-map a CSR matrix written by _save_matrix."""
+    arrays = [
+        np.load(os.path.join(directory, f'{prefix}_{name}.npy'), mmap_mode='r')
+        for name in ('data', 'indices', 'indptr')
+    ]
+    return csr_matrix(tuple(arrays), shape=tuple(shape), copy=False)
+
+def _save_vectorizer(directory, prefix, vectorizer):
+    """Write the fitted vocabulary and IDF weights of a vectorizer."""
+    vocabulary = {term: int(index) for term, index in vectorizer.vocabulary_.items()}
+    with open(os.path.join(directory, f'{prefix}_vocabulary.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocabulary, f)
+    np.save(os.path.join(directory, f'{prefix}_idf.npy'), vectorizer.idf_)
+
+def _load_vectorizer(directory, prefix, vectorizer):
+    """Restore a vectorizer's fitted state without refitting it."""
+    with open(os.path.join(directory, f'{prefix}_vocabulary.json'), 'r', encoding='utf-8') as f:
+        vectorizer.vocabulary_ = json.load(f)
+    vectorizer.idf_ = np.load(os.path.join(directory, f'{prefix}_idf.npy'))
+    return vectorizer
+
+def build_snapshot(snapshot_dir=SNAPSHOT_DIR, dataset_path=QA_DATASET_PATH):
+    """Fit the QA and intent models and write them as a snapshot directory.
+
+    Answers are streamed straight into the snapshot's answers file.
+    """
+    parent = os.path.dirname(os.path.abspath(snapshot_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.snapshot-', dir=parent)
+    try:
+        qa_pairs, questions, qa_vectors, qa_vectorizer, sources = load_qa_dataset(
+            dataset_path, os.path.join(staging, ANSWERS_FILE))
+        if qa_vectors is None:
+            raise ValueError(f"QA dataset '{dataset_path}' could not be vectorized")
+        np.save(os.path.join(staging, 'answer_spans.npy'), qa_pairs.spans)
+        qa_pairs.close()
+        intents, intent_mapping, intent_vectors, intent_vectorizer = intent_processor.initialize_intents()[:4]
+
+        manifest = _expected_manifest(dataset_path, intents)
+        manifest['intent_mapping'] = intent_mapping
+
+        manifest['qa_shape'] = _save_matrix(staging, 'qa', qa_vectors)
+        manifest['intent_shape'] = _save_matrix(staging, 'intent', intent_vectors)
+        _save_vectorizer(staging, 'qa', qa_vectorizer)
+        _save_vectorizer(staging, 'intent', intent_vectorizer)
+        with open(os.path.join(staging, 'questions.json'), 'w', encoding='utf-8') as f:
+            json.dump(questions, f)
+        with open(os.path.join(staging, 'sources.json'), 'w', encoding='utf-8') as f:
+            json.dump(sources, f)
+        # The manifest is written last so a partial snapshot is never valid.
+        with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.isdir(snapshot_dir):
+            shutil.rmtree(snapshot_dir)
+        os.replace(staging, snapshot_dir)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return snapshot_dir
+
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR, dataset_path=QA_DATASET_PATH):
+    """Load models from a snapshot, or return None if it is missing or stale."""
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    (
+        intents,
+        capabilities_response,
+        small_talk_responses,
+        greeting_responses,
+        farewell_responses
+    ) = intent_processor.get_intent_definitions()
+
+    expected = _expected_manifest(dataset_path, intents)
+    if any(manifest.get(key) != value for key, value in expected.items()):
+        return None
+
+    qa_vectorizer = _load_vectorizer(snapshot_dir, 'qa', build_qa_vectorizer())
+    intent_vectorizer = _load_vectorizer(snapshot_dir, 'intent', intent_processor.build_intent_vectorizer())
+    qa_vectors = _load_matrix(snapshot_dir, 'qa', manifest['qa_shape'])
+    intent_vectors = _load_matrix(snapshot_dir, 'intent', manifest['intent_shape'])
+
+    with open(os.path.join(snapshot_dir, 'questions.json'), 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    qa_pairs = AnswerStore.open(
+        os.path.join(snapshot_dir, ANSWERS_FILE), questions,
+        np.load(os.path.join(snapshot_dir, 'answer_spans.npy'), mmap_mode='r'))
+
+    with open(os.path.join(snapshot_dir, 'sources.json'), 'r', encoding='utf-8') as f:
+        titles = {}
+        sources = [titles.setdefault(source, source) for source in json.load(f)]
+
+    qa_models = (qa_pairs, questions, qa_vectors, qa_vectorizer, sources)
+    intent_models = (
+        intents,
+        manifest['intent_mapping'],
+        intent_vectors,
+        intent_vectorizer,
+        capabilities_response,
+        small_talk_responses,
+        greeting_responses,
+        farewell_responses
+    )
+    return qa_models, intent_models
+
+def load_models(snapshot_dir=SNAPSHOT_DIR, dataset_path=QA_DATASET_PATH, reload_intents=False):
+    """Load models from the snapshot, rebuilding it first if it is stale.
+
+    Returns the same tuples as load_qa_dataset() and initialize_intents().
+    If the snapshot cannot be read or written the models are fitted in memory.
+    With reload_intents the intent_processor module is re-imported first, so
+    edited intent phrases are picked up by a running process.
+    """
+    if reload_intents:
+        importlib.reload(intent_processor)
+    try:
+        models = load_snapshot(snapshot_dir, dataset_path)
+        if models is None:
+            build_snapshot(snapshot_dir, dataset_path)
+            models = load_snapshot(snapshot_dir, dataset_path)
+        if models is not None:
+            return models
+    except Exception as e:
+        print(f"Error loading model snapshot: {str(e)}")
+
+    return load_qa_dataset(dataset_path), intent_processor.initialize_intents()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precompiled model snapshot.")
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR)
+    parser.add_argument('--dataset', default=QA_DATASET_PATH)
+    args = parser.parse_args()
+
+    path = build_snapshot(args.snapshot_dir, args.dataset)
+    print(f"Snapshot written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# utils/patterns.py
+
+import re
+from collections import namedtuple
+
+PatternMatch = namedtuple('PatternMatch', ['group', 'index', 'pattern', 'captures'])
+
+WORD_BOUNDARY = r'\b'
+
+class PatternGroup:
+    """A list of regexes compiled into one alternation and searched once.
+
+    Each pattern becomes a named branch, so a hit reports which pattern
+    fired. In an ordered group the first listed pattern that matches
+    anywhere wins, exactly as when looping over the list with re.search;
+    otherwise the leftmost match wins. A word boundary shared by every
+    pattern is hoisted out of the alternation, which lets the regex engine
+    skip ahead to plausible first characters instead of trying every branch
+    at every position.
+    """
+
+    def __init__(self, name, patterns, ordered=True, flags=0):
+        """Patterns must not use named groups or numbered backreferences."""
+        self.name = name
+        self.patterns = list(patterns)
+        self.ordered = ordered
+        self.compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+
+        prefix = WORD_BOUNDARY if all(pattern.startswith(WORD_BOUNDARY) for pattern in self.patterns) else ''
+        branches = []
+        self._branches = []
+        group_number = 0
+        for index, (pattern, compiled) in enumerate(zip(self.patterns, self.compiled)):
+            label = f'{name}__{index}'
+            group_number += 1
+            self._branches.append((label, index, group_number + 1, group_number + 1 + compiled.groups))
+            group_number += compiled.groups
+            branches.append(f'(?P<{label}>{pattern[len(prefix):]})')
+        self.regex = re.compile(prefix + '(?:' + '|'.join(branches) + ')', flags)
+
+    def search(self, text):
+        """Return the PatternMatch for text, or None."""
+        match = self.regex.search(text)
+        if match is None:
+            return None
+        for label, index, first, end in self._branches:
+            if match.start(label) != -1:
+                break
+        if self.ordered:
+            # The alternation found the leftmost match; a pattern listed
+            # earlier still wins if it matches further right.
+            for earlier in range(index):
+                earlier_match = self.compiled[earlier].search(text)
+                if earlier_match:
+                    return PatternMatch(self.name, earlier, self.patterns[earlier], earlier_match.groups())
+        captures = tuple(match.group(number) for number in range(first, end))
+        return PatternMatch(self.name, index, self.patterns[index], captures)
+
+class PatternMatcher:
+    """Named PatternGroups sharing flags."""
+
+    def __init__(self, groups, flags=0):
+        """groups: (name, patterns, ordered) triples."""
+        self.groups = {
+            name: PatternGroup(name, patterns, ordered, flags)
+            for name, patterns, ordered in groups
+        }
+
+    def search(self, name, text):
+        """Return the PatternMatch of one group, or None."""
+        return self.groups[name].search(text)
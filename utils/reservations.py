@@ -0,0 +1,234 @@
+# utils/reservations.py
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+
+JOURNAL_PATH = 'bookings.journal'
+HOLD_TTL = 300
+
+# Open journals, whose writer threads a forked child has to start again.
+_journals = weakref.WeakSet()
+
+def _restart_writers():
+    for journal in list(_journals):
+        journal._start_writer()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_writers)
+
+class Journal:
+    """Append-only, fsync'd JSON-lines log with group commit.
+
+    append() blocks until its record is on disk. A single writer thread
+    drains every record queued since its last flush and makes them durable
+    with one write and one fsync, so concurrent bookings share the cost of
+    a disk flush instead of paying for one each.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._truncate_torn_tail()
+        # Unbuffered, so each group commit is a single O_APPEND write and
+        # records from several worker processes never interleave.
+        self._file = open(path, 'ab', buffering=0)
+        self._closed = False
+        self._start_writer()
+        _journals.add(self)
+
+    def _start_writer(self):
+        """Start the writer thread (again in a forked child, which has none)."""
+        self._pending = []
+        self._condition = threading.Condition()
+        self._writer = threading.Thread(target=self._write_loop, name='journal', daemon=True)
+        if not self._closed:
+            self._writer.start()
+
+    @staticmethod
+    def replay(path=JOURNAL_PATH):
+        """Yield the records of a journal; a torn final line is ignored."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    break
+
+    def _truncate_torn_tail(self):
+        """Cut a partial last record (from a crash mid-write) before appending."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                f.seek(max(0, end - 4096))
+                chunk = f.read(end - max(0, end - 4096))
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    end = max(0, end - 4096) + newline + 1
+                    break
+                end = max(0, end - 4096)
+            if end != size:
+                f.truncate(end)
+
+    def append(self, record):
+        """Write a record and return once it is durable."""
+        entry = {'data': (json.dumps(record) + '\n').encode('utf-8'), 'done': threading.Event(), 'error': None}
+        with self._condition:
+            if self._closed:
+                raise ValueError('journal is closed')
+            self._pending.append(entry)
+            self._condition.notify()
+        entry['done'].wait()
+        if entry['error'] is not None:
+            raise entry['error']
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._writer.is_alive():
+            self._writer.join()
+        self._file.close()
+        _journals.discard(self)
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                batch, self._pending = self._pending, []
+                if not batch and self._closed:
+                    return
+            error = None
+            try:
+                self._file.write(b''.join(entry['data'] for entry in batch))
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                error = e
+            for entry in batch:
+                entry['error'] = error
+                entry['done'].set()
+
+class ReservationEngine:
+    """Seat holds and bookings over a FlightInventory.
+
+    All seat accounting happens under one lock: a hold atomically checks that
+    every flight in it still has a free (unheld) seat and reserves one, and
+    holds lapse after `hold_ttl` seconds. A booking turns a hold into a seat
+    decrement and is acknowledged only once its journal record is durable;
+    on start-up the journal is replayed so bookings survive a restart. A
+    durable inventory (SqliteInventory) already persists its seat counts and
+    decrements them atomically, so its journal is an audit log only. Holds
+    are per process.
+    """
+
+    def __init__(self, inventory, journal_path=JOURNAL_PATH, hold_ttl=HOLD_TTL, clock=time.monotonic):
+        self.inventory = inventory
+        self.hold_ttl = hold_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._holds = {}
+        self._held = {}
+        self._expiry_queue = []
+        self._hold_ids = itertools.count(1)
+
+        for record in () if inventory.durable else Journal.replay(journal_path):
+            if record.get('type') == 'booking':
+                for flight_id in record['flights']:
+                    self.inventory.decrement_seats(flight_id)
+        self.journal = Journal(journal_path)
+
+    def available(self, flight_id):
+        """Seats on a flight that are neither booked nor held."""
+        with self._lock:
+            self._expire_holds()
+            return self.inventory.seats(flight_id) - self._held.get(flight_id, 0)
+
+    def hold(self, flight_ids, ttl=None):
+        """Hold one seat on every flight (all or nothing); return a hold id or None."""
+        flight_ids = tuple(flight_ids)
+        with self._lock:
+            self._expire_holds()
+            if not self._can_hold(flight_ids):
+                return None
+            hold_id = next(self._hold_ids)
+            self._add_hold(hold_id, flight_ids, ttl)
+            return hold_id
+
+    def release(self, hold_id):
+        """Give a held seat back (no-op for unknown or expired holds)."""
+        with self._lock:
+            self._remove_hold(hold_id)
+
+    def commit(self, flight_ids, hold_ids=(), details=None):
+        """Book one seat on every flight as a single durable booking.
+
+        The given holds are consumed first, so a booking covered by live holds
+        always succeeds; if a hold has lapsed, the booking still goes through
+        as long as unheld seats remain. Returns the booking id, or None.
+        """
+        flight_ids = list(flight_ids)
+        with self._lock:
+            self._expire_holds()
+            for hold_id in hold_ids:
+                self._remove_hold(hold_id)
+            if not flight_ids or not self._can_hold(flight_ids):
+                return None
+            if not self.inventory.book(flight_ids):
+                return None
+
+        booking_id = uuid.uuid4().hex
+        record = {'type': 'booking', 'booking_id': booking_id, 'flights': flight_ids, 'time': time.time()}
+        if details:
+            record['details'] = details
+        try:
+            self.journal.append(record)
+        except Exception as e:
+            print(f"Error writing booking journal: {str(e)}")
+            with self._lock:
+                for flight_id in flight_ids:
+                    self.inventory.decrement_seats(flight_id, -1)
+            return None
+        return booking_id
+
+    def _can_hold(self, flight_ids):
+        needed = {}
+        for flight_id in flight_ids:
+            needed[flight_id] = needed.get(flight_id, 0) + 1
+        return all(
+            self.inventory.seats(flight_id) - self._held.get(flight_id, 0) >= count
+            for flight_id, count in needed.items()
+        )
+
+    def _add_hold(self, hold_id, flight_ids, ttl):
+        expires_at = self.clock() + (self.hold_ttl if ttl is None else ttl)
+        self._holds[hold_id] = (flight_ids, expires_at)
+        heapq.heappush(self._expiry_queue, (expires_at, hold_id))
+        for flight_id in flight_ids:
+            self._held[flight_id] = self._held.get(flight_id, 0) + 1
+
+    def _remove_hold(self, hold_id):
+        hold = self._holds.pop(hold_id, None)
+        if hold is None:
+            return
+        for flight_id in hold[0]:
+            self._held[flight_id] -= 1
+            if not self._held[flight_id]:
+                del self._held[flight_id]
+
+    def _expire_holds(self):
+        now = self.clock()
+        while self._expiry_queue and self._expiry_queue[0][0] <= now:
+            _, hold_id = heapq.heappop(self._expiry_queue)
+            self._remove_hold(hold_id)
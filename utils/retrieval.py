@@ -0,0 +1,665 @@
+# utils/retrieval.py
+
+import threading
+from collections import Counter, namedtuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+IDF_DRIFT_THRESHOLD = 0.1
+MAX_SEGMENTS = 8
+TOP_SOURCES = 8
+ANN_DIMENSIONS = 128
+ANN_PROBES = 8
+ANN_RERANK = 100
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_CHUNK_ROWS = 65536
+
+def rank_rows(matrix, rows, term_ids, query_weights, k, min_score):
+    """Exactly score some rows of a CSR matrix against a sparse query and
+    return the top k (row, score) pairs with score >= min_score."""
+    if not len(rows) or not len(term_ids):
+        return []
+    # Dot products straight from the CSR arrays, which is cheaper than
+    # slicing a sparse matrix per query.
+    query = np.zeros(matrix.shape[1])
+    query[term_ids] = query_weights
+    starts = matrix.indptr[rows]
+    lengths = matrix.indptr[rows + 1] - starts
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    products = matrix.data[positions] * query[matrix.indices[positions]]
+    scores = np.bincount(np.repeat(np.arange(len(rows)), lengths), weights=products, minlength=len(rows))
+
+    qualifying = (scores >= min_score) & (scores > 0)
+    rows = rows[qualifying]
+    scores = scores[qualifying]
+    ranked = np.lexsort((rows, -scores))[:k]
+    return [(int(rows[i]), float(scores[i])) for i in ranked]
+
+class InvertedIndex:
+    """Top-k cosine retrieval over TF-IDF vectors using postings lists.
+
+    Document vectors are L2-normalised once at build time, so a cosine score is
+    the dot product of the (normalised) query weights with the postings
+    weights. Scoring only touches documents that share a term with the query,
+    and MaxScore-style pruning stops admitting new candidates once the
+    remaining query terms can no longer lift a document over the threshold.
+    """
+
+    def __init__(self, vectorizer, doc_vectors):
+        self.vectorizer = vectorizer
+        matrix = normalize(csr_matrix(doc_vectors, dtype=np.float64), norm='l2')
+        postings = matrix.tocsc()
+        postings.sort_indices()
+
+        self.matrix = matrix
+        self.num_docs = matrix.shape[0]
+        self.num_terms = matrix.shape[1]
+        # Postings for term t are doc_ids[offsets[t]:offsets[t + 1]] (sorted)
+        # with the matching weights.
+        self.offsets = postings.indptr
+        self.doc_ids = postings.indices
+        self.weights = postings.data
+
+        self.max_weights = np.zeros(self.num_terms)
+        non_empty = np.flatnonzero(np.diff(self.offsets))
+        if len(non_empty):
+            self.max_weights[non_empty] = np.maximum.reduceat(
+                self.weights, self.offsets[non_empty])
+
+    def __len__(self):
+        return self.num_docs
+
+    def query_vector(self, query):
+        """Return the (term ids, weights) of an L2-normalised query."""
+        vector = normalize(self.vectorizer.transform([query]), norm='l2')
+        return vector.indices, vector.data
+
+    def postings(self, term_id):
+        """Return the (doc ids, weights) postings for a term."""
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    def search(self, query, k=1, min_score=0.0):
+        """Return up to k (doc_id, score) pairs with score >= min_score.
+
+        Results are ordered by descending score, ties broken by doc id.
+        """
+        term_ids, query_weights = self.query_vector(query)
+        return self.search_vector(term_ids, query_weights, k, min_score)
+
+    def search_vector(self, term_ids, query_weights, k=1, min_score=0.0):
+        """Run a top-k search for an already vectorised query."""
+        if k <= 0 or self.num_docs == 0 or len(term_ids) == 0:
+            return []
+
+        upper_bounds = query_weights * self.max_weights[term_ids]
+        order = np.argsort(-upper_bounds, kind='stable')
+        term_ids = term_ids[order]
+        query_weights = query_weights[order]
+        upper_bounds = upper_bounds[order]
+        # remaining[i] is the best score terms i.. can still add to a document.
+        remaining = np.cumsum(upper_bounds[::-1])[::-1]
+
+        threshold = min_score
+        candidates = np.empty(0, dtype=self.doc_ids.dtype)
+        scores = np.empty(0)
+
+        for position, term_id in enumerate(term_ids):
+            if remaining[position] <= 0:
+                break
+            docs, weights = self.postings(term_id)
+            contribution = query_weights[position] * weights
+
+            if remaining[position] >= threshold:
+                # Essential term: documents seen here for the first time can
+                # still reach the threshold, so merge the whole postings list.
+                merged, inverse = np.unique(
+                    np.concatenate((candidates, docs)), return_inverse=True)
+                scores = np.bincount(
+                    inverse,
+                    weights=np.concatenate((scores, contribution)),
+                    minlength=len(merged))
+                candidates = merged
+            elif len(candidates):
+                # Non-essential term: only update documents already in play.
+                slots = np.searchsorted(docs, candidates)
+                slots[slots == len(docs)] = 0
+                hits = docs[slots] == candidates
+                scores[hits] += contribution[slots[hits]]
+
+            if not len(candidates):
+                continue
+
+            if len(scores) >= k:
+                kth_best = np.partition(scores, len(scores) - k)[len(scores) - k]
+                threshold = max(threshold, kth_best)
+
+            still_possible = remaining[position + 1] if position + 1 < len(remaining) else 0.0
+            keep = scores + still_possible + 1e-12 >= threshold
+            if not keep.all():
+                candidates = candidates[keep]
+                scores = scores[keep]
+
+        qualifying = scores >= min_score
+        candidates = candidates[qualifying]
+        scores = scores[qualifying]
+        ranked = np.lexsort((candidates, -scores))[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in ranked]
+
+    def search_batch(self, queries, k=1, min_score=0.0):
+        """Score many queries with one sparse matrix product.
+
+        Returns one search() style result list per query. Batching amortises
+        the vectorizer and sparse-product overhead across all queries.
+        """
+        if not queries:
+            return []
+        if k <= 0 or self.num_docs == 0:
+            return [[] for _ in queries]
+
+        query_vectors = normalize(self.vectorizer.transform(queries), norm='l2')
+        return self.search_matrix(query_vectors, k, min_score)
+
+    def search_matrix(self, query_vectors, k=1, min_score=0.0):
+        """search_batch for already vectorised (L2-normalised) queries."""
+        if k <= 0 or self.num_docs == 0:
+            return [[] for _ in range(query_vectors.shape[0])]
+        similarities = (query_vectors @ self.matrix.T).tocsr()
+        similarities.sort_indices()
+
+        results = []
+        for row in range(similarities.shape[0]):
+            start, end = similarities.indptr[row], similarities.indptr[row + 1]
+            candidates = similarities.indices[start:end]
+            scores = similarities.data[start:end]
+            qualifying = (scores >= min_score) & (scores > 0)
+            candidates = candidates[qualifying]
+            scores = scores[qualifying]
+            ranked = np.lexsort((candidates, -scores))[:k]
+            results.append([(int(candidates[i]), float(scores[i])) for i in ranked])
+        return results
+
+class HierarchicalIndex:
+    """Two-stage retrieval: pick source documents first, then score their questions.
+
+    Each question belongs to a group (its source document, from the
+    dataset's Document column). A query is first scored against one
+    centroid per group, the normalised sum of the group's question vectors,
+    and only the questions of the `top_groups` best groups, plus those with
+    no group (-1), are then scored exactly. The cost follows the number of
+    groups and the size of the few chosen, not the size of the corpus.
+    Offers the search interface of InvertedIndex.
+    """
+
+    def __init__(self, vectorizer, doc_vectors, groups, top_groups=TOP_SOURCES):
+        self.vectorizer = vectorizer
+        self.top_groups = top_groups
+        self.matrix = normalize(csr_matrix(doc_vectors, dtype=np.float64), norm='l2')
+        self.num_docs, self.num_terms = self.matrix.shape
+
+        groups = np.asarray(groups, dtype=np.int64)
+        grouped = np.flatnonzero(groups >= 0)
+        num_groups = int(groups[grouped].max()) + 1 if len(grouped) else 0
+        membership = csr_matrix(
+            (np.ones(len(grouped)), (groups[grouped], grouped)), shape=(num_groups, self.num_docs))
+        self.centroids = InvertedIndex(vectorizer, membership @ self.matrix)
+        # Members of group g are members[member_offsets[g]:member_offsets[g + 1]].
+        self.members = grouped[np.argsort(groups[grouped], kind='stable')]
+        self.member_offsets = np.searchsorted(groups[self.members], np.arange(num_groups + 1))
+        self.ungrouped = np.flatnonzero(groups < 0)
+
+    def __len__(self):
+        return self.num_docs
+
+    def candidates(self, group_hits):
+        """Row ids of the chosen groups' questions and of ungrouped ones."""
+        rows = [self.members[self.member_offsets[group]:self.member_offsets[group + 1]] for group, _ in group_hits]
+        rows.append(self.ungrouped)
+        return np.concatenate(rows)
+
+    def search(self, query, k=1, min_score=0.0):
+        vector = normalize(self.vectorizer.transform([query]), norm='l2')
+        return self.search_vector(vector.indices, vector.data, k, min_score)
+
+    def search_vector(self, term_ids, query_weights, k=1, min_score=0.0):
+        """Run a two-stage top-k search for an already vectorised query."""
+        if k <= 0 or self.num_docs == 0 or len(term_ids) == 0:
+            return []
+        group_hits = self.centroids.search_vector(term_ids, query_weights, self.top_groups)
+        return self._rank(self.candidates(group_hits), term_ids, query_weights, k, min_score)
+
+    def search_matrix(self, query_vectors, k=1, min_score=0.0):
+        """search_vector for each row of a query matrix."""
+        if k <= 0 or self.num_docs == 0:
+            return [[] for _ in range(query_vectors.shape[0])]
+        query_vectors = csr_matrix(query_vectors)
+        group_hits = self.centroids.search_matrix(query_vectors, self.top_groups)
+        results = []
+        for row, hits in enumerate(group_hits):
+            start, end = query_vectors.indptr[row], query_vectors.indptr[row + 1]
+            results.append(self._rank(
+                self.candidates(hits), query_vectors.indices[start:end], query_vectors.data[start:end],
+                k, min_score))
+        return results
+
+    def _rank(self, rows, term_ids, query_weights, k, min_score):
+        return rank_rows(self.matrix, rows, term_ids, query_weights, k, min_score)
+
+class ANNIndex:
+    """Approximate top-k retrieval for very large corpora: an inverted file
+    (IVF) over TruncatedSVD projections of the TF-IDF vectors.
+
+    Document vectors are projected to `dimensions` dense dimensions and
+    split into `num_lists` clusters by spherical k-means. A query is
+    projected the same way, the documents of the `probes` nearest clusters
+    are scored with dense dot products, and the best `rerank` of them are
+    rescored exactly against the sparse vectors, so the scores returned are
+    true cosines. More probes (or a larger rerank) buy recall with latency.
+    Offers the search interface of InvertedIndex.
+    """
+
+    def __init__(self, vectorizer, doc_vectors, dimensions=ANN_DIMENSIONS, num_lists=None,
+                 probes=ANN_PROBES, rerank=ANN_RERANK, seed=0):
+        self.vectorizer = vectorizer
+        self.probes = probes
+        self.rerank = rerank
+        self.matrix = normalize(csr_matrix(doc_vectors, dtype=np.float64), norm='l2')
+        self.num_docs, self.num_terms = self.matrix.shape
+        if self.num_docs == 0:
+            self.centroids = np.empty((0, 0), dtype=np.float32)
+            return
+
+        from sklearn.decomposition import TruncatedSVD
+
+        dimensions = max(1, min(dimensions, self.num_terms - 1, self.num_docs))
+        self.svd = TruncatedSVD(dimensions, algorithm='randomized', random_state=seed)
+        embeddings = self._project(self.svd.fit_transform(self.matrix))
+        # Term -> dense direction, i.e. what svd.transform() multiplies by.
+        self.projection = np.ascontiguousarray(self.svd.components_.T, dtype=np.float32)
+        num_lists = min(num_lists or max(1, int(np.sqrt(self.num_docs))), self.num_docs)
+        self.centroids = self._kmeans(embeddings, num_lists, np.random.default_rng(seed))
+
+        assignments = self._assign(embeddings)
+        # Documents are stored list by list, so a probe scans one slice.
+        self.list_docs = np.argsort(assignments, kind='stable')
+        self.list_offsets = np.searchsorted(assignments[self.list_docs], np.arange(num_lists + 1))
+        self.embeddings = embeddings[self.list_docs]
+
+    def __len__(self):
+        return self.num_docs
+
+    @staticmethod
+    def _project(vectors):
+        return normalize(np.asarray(vectors)).astype(np.float32)
+
+    def _kmeans(self, embeddings, num_lists, rng):
+        """Spherical k-means on a sample of the embeddings."""
+        sample_size = min(len(embeddings), KMEANS_SAMPLE_PER_LIST * num_lists)
+        sample = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, num_lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            membership = csr_matrix(
+                (np.ones(sample_size, dtype=np.float32), (assignments, np.arange(sample_size))),
+                shape=(num_lists, sample_size))
+            sums = np.asarray(membership @ sample)
+            filled = np.asarray(membership.sum(axis=1)).ravel() > 0
+            # Empty clusters keep their previous centroid.
+            centroids[filled] = self._project(sums[filled])
+        return centroids
+
+    def _assign(self, embeddings):
+        """Nearest centroid of every embedding, in chunks to bound memory."""
+        return np.concatenate([
+            np.argmax(embeddings[start:start + ASSIGN_CHUNK_ROWS] @ self.centroids.T, axis=1)
+            for start in range(0, len(embeddings), ASSIGN_CHUNK_ROWS)
+        ])
+
+    def candidates(self, embedded_query):
+        """Doc ids worth scoring exactly for one projected query."""
+        probes = min(self.probes, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ embedded_query), probes - 1)[:probes]
+        ranges = [(self.list_offsets[list_id], self.list_offsets[list_id + 1]) for list_id in lists]
+        positions = np.concatenate([np.arange(start, end) for start, end in ranges])
+        if len(positions) > self.rerank:
+            # Lists are contiguous, so each is scored in place (no gather).
+            dense_scores = np.concatenate([self.embeddings[start:end] @ embedded_query for start, end in ranges])
+            positions = positions[np.argpartition(-dense_scores, self.rerank - 1)[:self.rerank]]
+        return self.list_docs[positions]
+
+    def search(self, query, k=1, min_score=0.0):
+        return self.search_matrix(normalize(self.vectorizer.transform([query]), norm='l2'), k, min_score)[0]
+
+    def search_vector(self, term_ids, query_weights, k=1, min_score=0.0):
+        """Run an approximate top-k search for an already vectorised query."""
+        if k <= 0 or self.num_docs == 0 or len(term_ids) == 0:
+            return []
+        embedded = query_weights.astype(np.float32) @ self.projection[term_ids]
+        embedded /= np.linalg.norm(embedded) or 1.0
+        return rank_rows(self.matrix, self.candidates(embedded), term_ids, query_weights, k, min_score)
+
+    def search_matrix(self, query_vectors, k=1, min_score=0.0):
+        """search_vector for each row of a query matrix, projecting them together."""
+        if k <= 0 or self.num_docs == 0:
+            return [[] for _ in range(query_vectors.shape[0])]
+        query_vectors = csr_matrix(query_vectors)
+        embedded = self._project(query_vectors @ self.projection)
+        results = []
+        for row in range(query_vectors.shape[0]):
+            start, end = query_vectors.indptr[row], query_vectors.indptr[row + 1]
+            if start == end:
+                results.append([])
+                continue
+            results.append(rank_rows(
+                self.matrix, self.candidates(embedded[row]),
+                query_vectors.indices[start:end], query_vectors.data[start:end], k, min_score))
+        return results
+
+class ExactMatchIndex:
+    """Hash lookup from a normalised question to its document id.
+
+    Questions are normalised the way the vectorizer sees them (lowercased,
+    tokenised, stop words dropped) and joined back into a key, so queries
+    differing only in case, punctuation, spacing or stop words share a key.
+    Such a query has the same TF-IDF vector as the question and would score
+    1.0 against it; the lookup answers it without vectorising or scanning.
+    Documents with an empty vector are left out, since the scorer can never
+    match them.
+    """
+
+    def __init__(self, vectorizer, questions, doc_vectors):
+        self._preprocess = vectorizer.build_preprocessor()
+        self._tokenize = vectorizer.build_tokenizer()
+        self._stop_words = vectorizer.get_stop_words() or frozenset()
+        non_empty = np.diff(csr_matrix(doc_vectors).indptr) > 0
+        self._doc_ids = {}
+        for doc_id, question in enumerate(questions):
+            key = self.key(question)
+            if key and non_empty[doc_id]:
+                self._doc_ids.setdefault(key, doc_id)
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def key(self, text):
+        """Return the normalised form of a question."""
+        tokens = self._tokenize(self._preprocess(text))
+        return ' '.join(token for token in tokens if token not in self._stop_words)
+
+    def lookup(self, query):
+        """Return the doc id whose question normalises like query, or None."""
+        return self._doc_ids.get(self.key(query))
+
+    def add(self, doc_id, question):
+        """Index a newly added question."""
+        key = self.key(question)
+        if key:
+            self._doc_ids.setdefault(key, doc_id)
+
+    def remove(self, doc_id, question):
+        """Stop answering a deleted question's key with it."""
+        key = self.key(question)
+        if self._doc_ids.get(key) == doc_id:
+            del self._doc_ids[key]
+
+_IndexState = namedtuple('_IndexState', [
+    'segments', 'vocabulary', 'extra_terms', 'idf', 'df', 'deleted', 'unpurged', 'num_live', 'version',
+])
+
+class QAIndex:
+    """InvertedIndex over a QA corpus that accepts additions and deletions.
+
+    The fitted corpus is the first segment. Each add() indexes only the new
+    rows into a small segment of its own (merged once there are more than
+    `max_segments`), and remove() leaves a tombstone, so an edit costs
+    O(new rows). Tombstones are permanent: rebuilt segments index deleted
+    rows as empty, so they neither score nor count towards document
+    frequencies. Terms the vectorizer has never seen get new term ids.
+    Document frequencies are kept up to date, but weights stay on the IDF
+    in force when they were computed; once those IDFs are off by more than
+    `drift_threshold` on average (see drift()), every document is
+    re-weighted with fresh IDFs (same vocabulary, no refit). Queries are
+    vectorised against the stored IDFs, so scores stay true cosines.
+
+    `sources` (shared like `documents`) records the source document of each
+    row, or None. With `top_sources` set, the fitted and re-weighted
+    segments are HierarchicalIndexes grouped by source, searching only the
+    questions of the top_sources best matching sources. With `ann_probes`
+    set they are ANNIndexes probing that many clusters instead.
+
+    Writers are serialised and publish a new immutable state with a single
+    reference swap, so searches never block and never see a half-applied
+    edit. The `documents` and `sources` lists are shared with the caller and
+    only appended to.
+    """
+
+    def __init__(self, vectorizer, documents, doc_vectors, sources=None,
+                 drift_threshold=IDF_DRIFT_THRESHOLD, max_segments=MAX_SEGMENTS, top_sources=None, ann_probes=None):
+        self.vectorizer = vectorizer
+        self.documents = documents
+        self.sources = sources
+        self.top_sources = top_sources
+        self.ann_probes = ann_probes
+        self.drift_threshold = drift_threshold
+        self.max_segments = max_segments
+        self._analyze = vectorizer.build_analyzer()
+        self._lock = threading.Lock()
+        self._live = {document: doc_id for doc_id, document in enumerate(documents)}
+
+        matrix = csr_matrix(doc_vectors)
+        self._state = _IndexState(
+            segments=((0, self._full_segment(matrix)),),
+            vocabulary=vectorizer.vocabulary_,
+            extra_terms={},
+            idf=np.asarray(vectorizer.idf_, dtype=np.float64),
+            df=np.bincount(matrix.indices, minlength=matrix.shape[1]),
+            deleted=frozenset(),
+            unpurged=frozenset(),
+            num_live=matrix.shape[0],
+            version=0,
+        )
+
+    def __len__(self):
+        return self._state.num_live
+
+    @property
+    def version(self):
+        """Incremented by every edit (for caches of search results)."""
+        return self._state.version
+
+    def doc_id(self, document):
+        """Return the id of a live document, or None."""
+        return self._live.get(document)
+
+    def source(self, doc_id):
+        """Return the source document of a row, or None."""
+        return self.sources[doc_id] if self.sources is not None and doc_id is not None else None
+
+    def _full_segment(self, matrix):
+        """Segment over every row, approximate or two-stage if configured."""
+        if self.ann_probes:
+            return ANNIndex(self.vectorizer, matrix, probes=self.ann_probes)
+        if self.sources is None or not self.top_sources:
+            return InvertedIndex(self.vectorizer, matrix)
+        group_ids = {}
+        groups = [
+            group_ids.setdefault(source, len(group_ids)) if source else -1
+            for source in self.sources[:matrix.shape[0]]
+        ]
+        return HierarchicalIndex(self.vectorizer, matrix, groups, self.top_sources)
+
+    def _term_id(self, state, term):
+        term_id = state.vocabulary.get(term)
+        return state.extra_terms.get(term) if term_id is None else term_id
+
+    def _counts(self, state, texts, add_terms=None):
+        """Term-count CSR rows for texts; unseen terms are assigned new ids in
+        add_terms when it is given, and dropped otherwise."""
+        indptr, indices, data = [0], [], []
+        next_term = len(state.idf) + (len(add_terms) if add_terms is not None else 0)
+        for text in texts:
+            counts = Counter()
+            for term in self._analyze(text):
+                term_id = self._term_id(state, term)
+                if term_id is None and add_terms is not None:
+                    term_id = add_terms.get(term)
+                    if term_id is None:
+                        term_id = add_terms[term] = next_term
+                        next_term += 1
+                if term_id is not None:
+                    counts[term_id] += 1
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr)),
+            shape=(len(texts), next_term))
+
+    @staticmethod
+    def _weigh(counts, idf):
+        return normalize(csr_matrix(counts.multiply(idf[:counts.shape[1]])), norm='l2')
+
+    @staticmethod
+    def _idf(df, num_docs):
+        """Smoothed IDF, as TfidfVectorizer computes it."""
+        return np.log((1 + num_docs) / (1 + df)) + 1
+
+    def vectorize(self, queries, state=None):
+        """L2-normalised TF-IDF rows for queries under the current weights."""
+        state = state or self._state
+        return self._weigh(self._counts(state, queries), state.idf)
+
+    def search(self, query, k=1, min_score=0.0):
+        """Return up to k (doc_id, score) pairs with score >= min_score."""
+        state = self._state
+        vector = self.vectorize([query], state)
+        term_ids, weights = vector.indices, vector.data
+        results = []
+        for offset, segment in state.segments:
+            inside = term_ids < segment.num_terms
+            hits = segment.search_vector(term_ids[inside], weights[inside], k + len(state.unpurged), min_score)
+            results.extend((offset + doc_id, score) for doc_id, score in hits)
+        return self._top(results, state, k)
+
+    def search_batch(self, queries, k=1, min_score=0.0):
+        """Batch version of search: one sparse product per segment."""
+        if not queries:
+            return []
+        state = self._state
+        query_vectors = self.vectorize(queries, state)
+        results = [[] for _ in queries]
+        for offset, segment in state.segments:
+            hits = segment.search_matrix(
+                query_vectors[:, :segment.num_terms], k + len(state.unpurged), min_score)
+            for result, segment_hits in zip(results, hits):
+                result.extend((offset + doc_id, score) for doc_id, score in segment_hits)
+        return [self._top(result, state, k) for result in results]
+
+    @staticmethod
+    def _top(results, state, k):
+        results = [result for result in results if result[0] not in state.deleted]
+        results.sort(key=lambda result: (-result[1], result[0]))
+        return results[:k]
+
+    def add(self, documents, sources=None):
+        """Index new documents (from the given sources, if any); return their
+        ids (existing ids for documents already in the index)."""
+        sources = list(sources) if sources is not None else [None] * len(documents)
+        with self._lock:
+            state = self._state
+            doc_ids = []
+            new_ids = {}
+            new_sources = []
+            for document, source in zip(documents, sources):
+                doc_id = self._live.get(document)
+                if doc_id is None and document not in new_ids:
+                    new_sources.append(source)
+                if doc_id is None:
+                    doc_id = new_ids.setdefault(document, len(self.documents) + len(new_ids))
+                doc_ids.append(doc_id)
+            new_documents = list(new_ids)
+            if not new_documents:
+                return doc_ids
+
+            added_terms = {}
+            counts = self._counts(state, new_documents, added_terms)
+            df = np.bincount(counts.indices, minlength=counts.shape[1])
+            df[:len(state.df)] += state.df
+            num_live = state.num_live + len(new_documents)
+            # New terms are weighted with their IDF as of now.
+            idf = np.concatenate((state.idf, self._idf(df[len(state.idf):], num_live)))
+            extra_terms = dict(state.extra_terms, **added_terms) if added_terms else state.extra_terms
+
+            offset = len(self.documents)
+            segment = InvertedIndex(self.vectorizer, self._weigh(counts, idf))
+            if self.sources is not None:
+                self.sources.extend(new_sources)
+            self.documents.extend(new_documents)
+            for doc_id, document in enumerate(new_documents, offset):
+                self._live[document] = doc_id
+            self._publish(state._replace(
+                segments=state.segments + ((offset, segment),),
+                extra_terms=extra_terms, idf=idf, df=df, num_live=num_live))
+            return doc_ids
+
+    def remove(self, document):
+        """Delete a document; return its id, or None if it is not indexed."""
+        with self._lock:
+            doc_id = self._live.pop(document, None)
+            if doc_id is None:
+                return None
+            state = self._state
+            counts = self._counts(state, [document])
+            df = state.df.copy()
+            df[np.unique(counts.indices)] -= 1
+            self._publish(state._replace(
+                deleted=state.deleted | {doc_id}, unpurged=state.unpurged | {doc_id},
+                df=df, num_live=state.num_live - 1))
+            return doc_id
+
+    def drift(self, state=None):
+        """Relative error of the stored IDFs against current document
+        frequencies, averaged over postings (so rare terms count little)."""
+        state = state or self._state
+        live = state.df > 0
+        if not live.any():
+            return 0.0
+        current = self._idf(state.df[live], state.num_live)
+        error = np.abs(current - state.idf[live]) / state.idf[live]
+        return float(np.average(error, weights=state.df[live]))
+
+    def _publish(self, state):
+        """Re-weight or merge segments if due, then swap the state in."""
+        if self.drift(state) > self.drift_threshold:
+            state = self._reweight(state)
+        elif len(state.segments) > self.max_segments:
+            state = self._merge(state)
+        self._state = state._replace(version=state.version + 1)
+
+    def _rows(self, state, start):
+        """Term counts of documents start.. with deleted ones left empty."""
+        texts = [
+            '' if doc_id in state.deleted else document
+            for doc_id, document in enumerate(self.documents[start:], start)
+        ]
+        return self._counts(state, texts)
+
+    def _merge(self, state):
+        """Fold every added segment into one (weights unchanged)."""
+        offset = state.segments[1][0]
+        segment = InvertedIndex(self.vectorizer, self._weigh(self._rows(state, offset), state.idf))
+        unpurged = frozenset(doc_id for doc_id in state.unpurged if doc_id < offset)
+        return state._replace(segments=(state.segments[0], (offset, segment)), unpurged=unpurged)
+
+    def _reweight(self, state):
+        """Recompute every IDF and weight from current document frequencies."""
+        counts = self._rows(state, 0)
+        df = np.bincount(counts.indices, minlength=len(state.idf))
+        idf = self._idf(df, state.num_live)
+        segment = self._full_segment(self._weigh(counts, idf))
+        # Deleted rows stay in `deleted` (so later rebuilds keep them empty);
+        # they no longer hold any postings.
+        return state._replace(segments=((0, segment),), idf=idf, df=df, unpurged=frozenset())
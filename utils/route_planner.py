@@ -0,0 +1,192 @@
+# utils/route_planner.py
+
+import bisect
+import heapq
+import itertools
+import threading
+import time
+
+from utils.flight_inventory import normalize_city, parse_date
+
+# The inventory only has departure dates (no times), so layovers are whole
+# days between the arrival date (taken as the departure date) and the next
+# departure.
+MIN_LAYOVER_DAYS = 1
+MAX_LAYOVER_DAYS = 3
+MAX_STOPS = 2
+LATENCY_BUDGET_MS = 50
+
+def as_itinerary(legs):
+    """Wrap connecting flights in a flight-like dict the booking flow can show."""
+    first, last = legs[0], legs[-1]
+    return {
+        'flight_id': '+'.join(str(leg['flight_id']) for leg in legs),
+        'departure_city': first['departure_city'],
+        'destination_city': last['destination_city'],
+        'departure_date': first['departure_date'],
+        'arrival_date': last['departure_date'],
+        'available_seats': min(leg['available_seats'] for leg in legs),
+        'price': sum(leg['price'] for leg in legs),
+        'legs': list(legs),
+    }
+
+class RoutePlanner:
+    """Cheapest or fastest 1-2 stop connections over a FlightInventory.
+
+    The time-expanded graph has one node per flight (a departure event at a
+    city and date); an edge joins a flight to every flight leaving its
+    destination within the layover window. Departures are indexed per city
+    by date, so the edges of a node are one binary search away and are
+    generated on the fly. The index keeps (date, city, id, price) tuples
+    rather than flight dicts, seat counts are read live from the inventory
+    and legs are fetched only for the itineraries returned. The search is A* (Dijkstra with an admissible
+    bound: the cheapest flight into the destination) with dominance pruning
+    per (city, date), a cycle check and a hard latency budget, after which
+    the best itineraries found so far are returned.
+
+    The index is built with the planner and afterwards only extended with
+    the flights added to the inventory since (checked once per search);
+    seat changes never touch it.
+    """
+
+    def __init__(self, inventory, min_layover_days=MIN_LAYOVER_DAYS,
+                 max_layover_days=MAX_LAYOVER_DAYS, max_stops=MAX_STOPS,
+                 budget_ms=LATENCY_BUDGET_MS):
+        self.inventory = inventory
+        self.min_layover_days = min_layover_days
+        self.max_layover_days = max_layover_days
+        self.max_stops = max_stops
+        self.budget_ms = budget_ms
+        self._lock = threading.Lock()
+        self._build_index()
+
+    @staticmethod
+    def _event(flight):
+        """(origin, (ordinal, destination, flight_id, price)) of a flight, or None."""
+        ordinal = parse_date(flight['departure_date'])
+        if ordinal is None:
+            return None
+        return normalize_city(flight['departure_city']), (
+            ordinal, normalize_city(flight['destination_city']), flight['flight_id'], flight['price'])
+
+    def _build_index(self):
+        """Index departures by city and date, and cheapest arrival per city."""
+        # Read first, so flights added while indexing are picked up by refresh().
+        version = self.inventory.version
+        departures = {}
+        cheapest_arrival = {}
+        for flight in self.inventory:
+            indexed = self._event(flight)
+            if indexed is None:
+                continue
+            origin, event = indexed
+            departures.setdefault(origin, []).append(event)
+            if event[3] < cheapest_arrival.get(event[1], float('inf')):
+                cheapest_arrival[event[1]] = event[3]
+
+        self._departures = {}
+        for city, events in departures.items():
+            events.sort(key=lambda event: event[0])
+            self._departures[city] = ([event[0] for event in events], events)
+        self._cheapest_arrival = cheapest_arrival
+        self._indexed_version = version
+
+    def refresh(self):
+        """Index the flights added to the inventory since the last refresh.
+
+        A city's lists are replaced rather than changed in place, so a
+        search running meanwhile sees either the old or the new departures.
+        """
+        if self._indexed_version == self.inventory.version:
+            return
+        with self._lock:
+            version, flights = self.inventory.flights_added_since(self._indexed_version)
+            for flight in flights:
+                indexed = self._event(flight)
+                if indexed is None:
+                    continue
+                origin, event = indexed
+                dates, events = self._departures.get(origin, ([], []))
+                position = bisect.bisect_right(dates, event[0])
+                self._departures[origin] = (
+                    dates[:position] + [event[0]] + dates[position:],
+                    events[:position] + [event] + events[position:])
+                if event[3] < self._cheapest_arrival.get(event[1], float('inf')):
+                    self._cheapest_arrival[event[1]] = event[3]
+            self._indexed_version = version
+
+    def departures(self, city, start, end):
+        """Departure events (ordinal, destination, flight_id, price) from a city in [start, end]."""
+        dates, events = self._departures.get(city, ((), ()))
+        low = bisect.bisect_left(dates, start)
+        high = bisect.bisect_right(dates, end, lo=low)
+        return events[low:high]
+
+    def search(self, origin, destination, travel_date, objective='cheapest', limit=3, window_days=0):
+        """Return up to `limit` itineraries (see as_itinerary), best first.
+
+        objective is 'cheapest' (total price) or 'fastest' (days from the
+        first departure to the arrival, then price). The first leg departs within +/- window_days of
+        travel_date. Only itineraries with at least one stop are returned;
+        direct flights are the inventory's job.
+        """
+        start = travel_date if isinstance(travel_date, int) else parse_date(travel_date)
+        if start is None:
+            return []
+        # Checked once per search: the version is a cheap counter, but on a
+        # SqliteInventory still a query.
+        self.refresh()
+        origin, destination = normalize_city(origin), normalize_city(destination)
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        lower_bound = self._cheapest_arrival.get(destination)
+        if lower_bound is None:
+            return []
+
+        def priority(ordinal, price, city, departed):
+            if objective == 'fastest':
+                return (ordinal - departed, price)
+            return (price + (0 if city == destination else lower_bound),)
+
+        counter = itertools.count()
+        queue = []
+        seats = self.inventory.seats
+        for ordinal, city, flight_id, price in self.departures(origin, start - window_days, start + window_days):
+            if city != destination and seats(flight_id) > 0:
+                legs = (flight_id,)
+                heapq.heappush(queue, (priority(ordinal, price, city, ordinal), next(counter),
+                                       ordinal, city, price, legs, (origin, city), ordinal))
+
+        labels = {}
+        results = []
+        while queue and len(results) < limit:
+            if time.perf_counter() > deadline:
+                break
+            _, _, ordinal, city, price, legs, visited, departed = heapq.heappop(queue)
+
+            if city == destination:
+                results.append(as_itinerary([self.inventory.get(flight_id) for flight_id in legs]))
+                continue
+
+            # Dominance: skip once `limit` partial routes have reached this
+            # city on this date at no greater cost with no more legs.
+            previous = labels.setdefault((city, ordinal), [])
+            dominated_by = sum(1 for count, cost in previous if count <= len(legs) and cost <= price)
+            if dominated_by >= limit:
+                continue
+            previous.append((len(legs), price))
+
+            if len(legs) > self.max_stops:
+                continue
+            final_leg = len(legs) == self.max_stops
+            window = self.departures(
+                city, ordinal + self.min_layover_days, ordinal + self.max_layover_days)
+            for next_ordinal, next_city, flight_id, leg_price in window:
+                if next_city in visited or (final_leg and next_city != destination):
+                    continue
+                if seats(flight_id) <= 0:
+                    continue
+                next_price = price + leg_price
+                heapq.heappush(queue, (priority(next_ordinal, next_price, next_city, departed), next(counter),
+                                       next_ordinal, next_city, next_price, legs + (flight_id,),
+                                       visited + (next_city,), departed))
+        return results
@@ -0,0 +1,72 @@
+# utils/session.py
+
+import time
+import uuid
+
+class Session:
+    """Per-conversation state, kept apart from the shared (read-only) models."""
+
+    __slots__ = ('user_name', 'in_transaction', 'transaction_data', 'conversation_history')
+
+    def __init__(self):
+        self.user_name = None
+        self.in_transaction = False
+        self.transaction_data = {
+            'departure_city': None,
+            'destination_city': None,
+            'trip_type': None,
+            'departure_date': None,
+            'return_date': None,
+            'date_flexible': None,
+        }
+        self.conversation_history = []
+
+class SessionStore:
+    """Session objects keyed by id, with idle expiry."""
+
+    def __init__(self, idle_timeout=1800, clock=time.monotonic):
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._sessions = {}
+        self._last_seen = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def create(self, session_id=None):
+        """Create a new session and return (session_id, session)."""
+        session_id = session_id or uuid.uuid4().hex
+        session = Session()
+        self._sessions[session_id] = session
+        self._last_seen[session_id] = self.clock()
+        return session_id, session
+
+    def get(self, session_id):
+        """Return the session for `session_id`, or None if unknown."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._last_seen[session_id] = self.clock()
+        return session
+
+    def get_or_create(self, session_id):
+        """Return (session, created) for `session_id`."""
+        session = self.get(session_id)
+        if session is not None:
+            return session, False
+        return self.create(session_id)[1], True
+
+    def discard(self, session_id):
+        """Forget a session."""
+        self._sessions.pop(session_id, None)
+        self._last_seen.pop(session_id, None)
+
+    def expire(self):
+        """Drop sessions idle for longer than idle_timeout; return how many."""
+        cutoff = self.clock() - self.idle_timeout
+        expired = [sid for sid, seen in self._last_seen.items() if seen < cutoff]
+        for session_id in expired:
+            self.discard(session_id)
+        return len(expired)
@@ -0,0 +1,229 @@
+# utils/sqlite_inventory.py
+
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+
+from utils.flight_inventory import TICKETS_PATH, normalize_city, parse_date
+
+TICKETS_DB_PATH = 'tickets.db'
+
+COLUMNS = ('flight_id', 'departure_city', 'destination_city', 'departure_date', 'available_seats', 'price')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights (
+    flight_id INTEGER PRIMARY KEY,
+    departure_city TEXT NOT NULL,
+    destination_city TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    available_seats INTEGER NOT NULL,
+    price REAL NOT NULL,
+    departure_key TEXT NOT NULL,
+    destination_key TEXT NOT NULL,
+    departure_day INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flights_by_route ON flights (
+    departure_key, destination_key, departure_day,
+    available_seats, price, flight_id, departure_city, destination_city, departure_date
+);
+"""
+
+# The statements below are fixed strings, so sqlite3's per-connection
+# statement cache prepares each of them once and reuses it afterwards.
+SELECT = 'SELECT ' + ', '.join(COLUMNS) + ' FROM flights'
+FIND_RANGE_SQL = SELECT + (
+    ' WHERE departure_key = ? AND destination_key = ? AND departure_day BETWEEN ? AND ?'
+    ' AND available_seats >= ? ORDER BY departure_day, flight_id')
+FIND_FLEXIBLE_SQL = SELECT + (
+    ' WHERE departure_key = ? AND destination_key = ? AND departure_day BETWEEN ? AND ?'
+    ' AND available_seats > 0 ORDER BY price, ABS(departure_day - ?), departure_day, flight_id LIMIT ?')
+GET_SQL = SELECT + ' WHERE flight_id = ?'
+SEATS_SQL = 'SELECT available_seats FROM flights WHERE flight_id = ?'
+BOOK_SQL = 'UPDATE flights SET available_seats = available_seats - ? WHERE flight_id = ? AND available_seats >= ?'
+RELEASE_SQL = 'UPDATE flights SET available_seats = available_seats - ? WHERE flight_id = ?'
+INSERT_SQL = 'INSERT OR REPLACE INTO flights VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+
+def flight_row(flight, city_cache=None, date_cache=None):
+    """Turn a flight dict into an INSERT_SQL row, or None if its date is invalid."""
+    city_cache = {} if city_cache is None else city_cache
+    date_cache = {} if date_cache is None else date_cache
+    departure_date = flight['departure_date']
+    day = date_cache.get(departure_date)
+    if day is None:
+        day = date_cache[departure_date] = parse_date(departure_date)
+        if day is None:
+            return None
+    keys = []
+    for name in (flight['departure_city'], flight['destination_city']):
+        key = city_cache.get(name)
+        if key is None:
+            key = city_cache[name] = normalize_city(name)
+        keys.append(key)
+    return (
+        int(flight['flight_id']), flight['departure_city'], flight['destination_city'],
+        departure_date, int(flight['available_seats']), float(flight['price']),
+        keys[0], keys[1], day,
+    )
+
+class SqliteInventory:
+    """FlightInventory backed by a SQLite database in WAL mode.
+
+    Offers the same lookups as FlightInventory, served from a covering
+    index on (departure, destination, date), so nothing but the rows asked
+    for is held in memory. Seat counts live in the database: book() is an
+    atomic conditional decrement, and several worker processes opening the
+    same file see one consistent inventory. Each thread and each forked
+    process gets its own connection.
+    """
+
+    durable = True
+
+    def __init__(self, path=TICKETS_DB_PATH, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=FULL')
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @staticmethod
+    def _flight(row):
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM flights').fetchone()[0]
+
+    @property
+    def version(self):
+        """Changes when flights are added (not when seats are booked): the
+        highest flight id, an index lookup rather than a COUNT(*) scan."""
+        return self._connection().execute('SELECT MAX(flight_id) FROM flights').fetchone()[0]
+
+    def flights_added_since(self, version):
+        """Return (current version, flights with ids above `version`). Flights
+        replaced under an existing id are not reported."""
+        rows = self._connection().execute(
+            SELECT + ' WHERE flight_id > ? ORDER BY flight_id', (-1 if version is None else version,)).fetchall()
+        flights = [self._flight(row) for row in rows]
+        return (flights[-1]['flight_id'] if flights else version), flights
+
+    def __iter__(self):
+        for row in self._connection().execute(SELECT + ' ORDER BY flight_id'):
+            yield self._flight(row)
+
+    def add(self, flight):
+        """Insert or replace a flight dict."""
+        row = flight_row(flight)
+        if row is not None:
+            self._connection().execute(INSERT_SQL, row)
+
+    def get(self, flight_id):
+        """Return the flight with this id, or None."""
+        return self._flight(self._connection().execute(GET_SQL, (flight_id,)).fetchone())
+
+    def seats(self, flight_id):
+        """Return the available seats on a flight (0 if unknown)."""
+        row = self._connection().execute(SEATS_SQL, (flight_id,)).fetchone()
+        return row[0] if row else 0
+
+    def decrement_seats(self, flight_id, count=1):
+        """Take `count` seats off a flight (negative to give seats back)."""
+        return self._connection().execute(RELEASE_SQL, (count, flight_id)).rowcount == 1
+
+    def book(self, flight_ids):
+        """Take one seat on every flight in a single transaction, or none at all."""
+        needed = {}
+        for flight_id in flight_ids:
+            needed[flight_id] = needed.get(flight_id, 0) + 1
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for flight_id, count in needed.items():
+                if connection.execute(BOOK_SQL, (count, flight_id, count)).rowcount != 1:
+                    connection.execute('ROLLBACK')
+                    return False
+            connection.execute('COMMIT')
+            return True
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def routes(self):
+        """Return the (departure, destination) keys of every route."""
+        return self._connection().execute(
+            'SELECT DISTINCT departure_key, destination_key FROM flights').fetchall()
+
+    def find_range(self, departure_city, destination_city, start, end, include_full=False):
+        """Return flights on a route departing between start and end inclusive."""
+        start = start if isinstance(start, int) else parse_date(start)
+        end = end if isinstance(end, int) else parse_date(end)
+        if start is None or end is None:
+            return []
+        rows = self._connection().execute(FIND_RANGE_SQL, (
+            normalize_city(departure_city), normalize_city(destination_city),
+            start, end, -2 ** 31 if include_full else 1))
+        return [self._flight(row) for row in rows]
+
+    def find(self, departure_city, destination_city, travel_date, include_full=False):
+        """Return flights on a route departing on one date."""
+        return self.find_range(
+            departure_city, destination_city, travel_date, travel_date, include_full)
+
+    def find_flexible(self, departure_city, destination_city, travel_date, window_days, limit=None):
+        """Return available flights within +/- window_days of a date, cheapest
+        first (ties go to the date closest to the requested one)."""
+        center = travel_date if isinstance(travel_date, int) else parse_date(travel_date)
+        if center is None:
+            return []
+        rows = self._connection().execute(FIND_FLEXIBLE_SQL, (
+            normalize_city(departure_city), normalize_city(destination_city),
+            center - window_days, center + window_days, center, limit or -1))
+        return [self._flight(row) for row in rows]
+
+def import_csv(csv_path=TICKETS_PATH, db_path=TICKETS_DB_PATH):
+    """Load a tickets.csv-style file into a SQLite inventory, replacing its
+    flights, and return the number of rows imported."""
+    inventory = SqliteInventory(db_path)
+    connection = inventory._connection()
+    city_cache, date_cache = {}, {}
+    count = 0
+    try:
+        with open(csv_path, 'r', encoding='utf-8', newline='') as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader)
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM flights')
+            for values in reader:
+                row = flight_row(dict(zip(header, values)), city_cache, date_cache)
+                if row is not None:
+                    connection.execute(INSERT_SQL, row)
+                    count += 1
+            connection.execute('COMMIT')
+    except Exception as e:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        print(f"Error importing ticket dataset: {e}")
+        return 0
+    connection.execute('ANALYZE')
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Import tickets.csv into a SQLite inventory.")
+    parser.add_argument('--csv', default=TICKETS_PATH)
+    parser.add_argument('--db', default=TICKETS_DB_PATH)
+    args = parser.parse_args()
+    count = import_csv(args.csv, args.db)
+    print(f"Imported {count} flights into {args.db}")
+
+if __name__ == '__main__':
+    main()
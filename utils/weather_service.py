@@ -1,68 +1,248 @@
 # utils/weather_service.py
 
-import requests
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-import pytz
-from timezonefinder import TimezoneFinder
-from geopy.geocoders import Nominatim
+from utils.cache import TTLCache
+from utils.gazetteer import get_gazetteer
 
-def get_coordinates(city):
-    """Get coordinates for a given city using Open-Meteo Geocoding API."""
-    try:
-        url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1&language=en&format=json"
-        response = requests.get(url)
+_MISSING = object()
+
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (2.0, 4.0)
+GEOCODE_TTL = 7 * 24 * 3600
+WEATHER_TTL = 10 * 60
+
+class WeatherClient:
+    """Pooled, cached Open-Meteo client with sync and asyncio entry points.
 
+    All requests share one requests.Session (keep-alive connection pool) and
+    use strict timeouts. Geocodes are cached for a long time and current
+    weather for a short one. Concurrent lookups of the same key are coalesced
+    so only one request is in flight per city (or coordinate pair). The
+    async methods run the blocking calls on the client's own thread pool, so
+    a slow upstream never blocks the event loop.
+    """
+
+    def __init__(self, geocoding_url=GEOCODING_URL, forecast_url=FORECAST_URL,
+                 timeout=REQUEST_TIMEOUT, geocode_ttl=GEOCODE_TTL, weather_ttl=WEATHER_TTL,
+                 max_connections=8, session=None):
+        import requests
+
+        self.geocoding_url = geocoding_url
+        self.forecast_url = forecast_url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=2, pool_maxsize=max_connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.geocode_cache = TTLCache(maxsize=10000, ttl=geocode_ttl)
+        self.weather_cache = TTLCache(maxsize=10000, ttl=weather_ttl)
+        self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='weather')
+        self._in_flight = {}
+        self._async_in_flight = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def _fetch_json(self, url, params):
+        response = self.session.get(url, params=params, timeout=self.timeout)
         if response.status_code == 200:
-            data = response.json()
-            if data.get('results'):
+            return response.json()
+        return None
+
+    def _coalesced(self, cache, key, fetch):
+        """Return a cached value, or fetch it once however many callers ask."""
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+            if value is not None:
+                cache.set(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def get_coordinates(self, city):
+        """Return (latitude, longitude, name, country) for a city, or None."""
+        def fetch():
+            data = self._fetch_json(self.geocoding_url, {
+                'name': city, 'count': 1, 'language': 'en', 'format': 'json'})
+            if data and data.get('results'):
                 result = data['results'][0]
                 return result['latitude'], result['longitude'], result['name'], result.get('country', '')
-        return None
-    except Exception:
-        return None
+            return None
+
+        try:
+            return self._coalesced(self.geocode_cache, ('geocode', city.strip().lower()), fetch)
+        except Exception:
+            return None
+
+    def get_current_weather(self, lat, lon):
+        """Return Open-Meteo's current_weather dict for a coordinate pair."""
+        def fetch():
+            data = self._fetch_json(self.forecast_url, {
+                'latitude': lat, 'longitude': lon,
+                'current_weather': 'true', 'temperature_unit': 'celsius'})
+            return data.get('current_weather') if data else None
+
+        return self._coalesced(self.weather_cache, ('weather', round(lat, 2), round(lon, 2)), fetch)
+
+    def get_weather(self, location=None):
+        """Fetch current weather data for a specific location."""
+        if not location:
+            return "Please specify a location. For example: 'What's the weather in London?'"
+
+        coordinates = self.get_coordinates(location)
+        if not coordinates:
+            return f"I couldn't find the location '{location}'. Please try another city."
+
+        lat, lon, city, country = coordinates
+        try:
+            current_weather = self.get_current_weather(lat, lon)
+
+            if current_weather:
+                temperature = current_weather.get('temperature')
+                windspeed = current_weather.get('windspeed')
+
+                if temperature is not None:
+                    weather_description = "warm" if temperature > 20 else "mild" if temperature > 10 else "cold"
+                    location_name = f"{city}, {country}" if country else city
+                    return f"The current temperature in {location_name} is {temperature}°C ({weather_description}) with a wind speed of {windspeed} km/h."
+
+            return "I'm sorry, I couldn't fetch the weather information at the moment."
+        except Exception:
+            return "Sorry, there was an error getting the weather data."
+
+    async def _arun(self, key, function, argument):
+        """Run a blocking call on the pool, sharing it with identical awaiters
+        so coalesced callers do not each tie up a pool thread."""
+        loop = asyncio.get_running_loop()
+        future = self._async_in_flight.get((loop, key))
+        if future is None:
+            future = loop.run_in_executor(self.executor, function, argument)
+            self._async_in_flight[(loop, key)] = future
+            future.add_done_callback(lambda _: self._async_in_flight.pop((loop, key), None))
+        return await asyncio.shield(future)
+
+    async def aget_weather(self, location=None):
+        """Async version of get_weather."""
+        return await self._arun(('weather', (location or '').strip().lower()), self.get_weather, location)
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_weather_client():
+    """Return the process-wide WeatherClient."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = WeatherClient()
+        return _default_client
+
+def weather_cache_stats():
+    """Return {cache name: TTLCache.stats()} for the process-wide client's
+    geocode and weather caches ({} until the client is first used)."""
+    client = _default_client
+    if client is None:
+        return {}
+    return {'geocode': client.geocode_cache.stats(), 'weather': client.weather_cache.stats()}
+
+def reset_weather_cache_stats():
+    """Zero the hit/miss counters of the process-wide client's caches."""
+    client = _default_client
+    if client is not None:
+        client.geocode_cache.reset_stats()
+        client.weather_cache.reset_stats()
+
+async def aget_weather(location=None):
+    """Async version of get_weather, run on the client's own thread pool."""
+    return await get_weather_client().aget_weather(location)
+
+async def aget_time_in_location(location):
+    """Async version of get_time_in_location (whose Nominatim fallback
+    blocks), run on the weather client's thread pool."""
+    return await asyncio.get_running_loop().run_in_executor(
+        get_weather_client().executor, get_time_in_location, location)
+
+def get_coordinates(city):
+    """Get coordinates for a given city using Open-Meteo Geocoding API."""
+    return get_weather_client().get_coordinates(city)
 
 def get_weather(location=None):
     """Fetch current weather data for a specific location."""
-    if not location:
-        return "Please specify a location. For example: 'What's the weather in London?'"
+    return get_weather_client().get_weather(location)
 
-    coordinates = get_coordinates(location)
-    if not coordinates:
-        return f"I couldn't find the location '{location}'. Please try another city."
+_timezone_finder = None
+_geolocator = None
+_fallback_lock = threading.Lock()
 
-    lat, lon, city, country = coordinates
-    try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true&temperature_unit=celsius"
-        response = requests.get(url)
+def get_timezone_finder():
+    """Return the process-wide TimezoneFinder (expensive to build, so built once)."""
+    global _timezone_finder
+    with _fallback_lock:
+        if _timezone_finder is None:
+            from timezonefinder import TimezoneFinder
+            _timezone_finder = TimezoneFinder()
+        return _timezone_finder
 
-        if response.status_code == 200:
-            data = response.json()
-            current_weather = data.get('current_weather', {})
-            temperature = current_weather.get('temperature')
-            windspeed = current_weather.get('windspeed')
+def get_geolocator():
+    """Return the process-wide Nominatim geocoder."""
+    global _geolocator
+    with _fallback_lock:
+        if _geolocator is None:
+            from geopy.geocoders import Nominatim
+            _geolocator = Nominatim(user_agent="chatbot", timeout=REQUEST_TIMEOUT[1])
+        return _geolocator
 
-            if temperature is not None:
-                weather_description = "warm" if temperature > 20 else "mild" if temperature > 10 else "cold"
-                location_name = f"{city}, {country}" if country else city
-                return f"The current temperature in {location_name} is {temperature}°C ({weather_description}) with a wind speed of {windspeed} km/h."
+def get_timezone_for_location(location):
+    """Return the IANA timezone name for a location, or None.
 
-        return "I'm sorry, I couldn't fetch the weather information at the moment."
-    except Exception:
-        return "Sorry, there was an error getting the weather data."
+    The bundled gazetteer answers offline; only unknown places fall back to
+    Nominatim geocoding plus the shared TimezoneFinder.
+    """
+    place = get_gazetteer().lookup(location)
+    if place:
+        return place.timezone
+
+    geocode_result = get_geolocator().geocode(location)
+    if geocode_result:
+        return get_timezone_finder().timezone_at(
+            lng=geocode_result.longitude, lat=geocode_result.latitude)
+    return None
 
 def get_time_in_location(location):
     """Get current time in the specified location."""
     try:
-        geolocator = Nominatim(user_agent="chatbot")
-        geocode_result = geolocator.geocode(location)
-        if geocode_result:
-            timezone_finder = TimezoneFinder()
-            timezone = timezone_finder.timezone_at(
-                lng=geocode_result.longitude, lat=geocode_result.latitude)
-            if timezone:
-                tz = pytz.timezone(timezone)
-                current_time = datetime.now(tz).strftime("%I:%M %p")
-                return f"The current time in {location} is {current_time}"
+        timezone = get_timezone_for_location(location)
+        if timezone:
+            import pytz
+
+            tz = pytz.timezone(timezone)
+            current_time = datetime.now(tz).strftime("%I:%M %p")
+            return f"The current time in {location} is {current_time}"
         return f"Sorry, I couldn't find the time for {location}."
     except Exception as e:
         print(f"Error in get_time_in_location: {str(e)}")
@@ -0,0 +1,274 @@
+# utils/worker_pool.py
+
+import gc
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from chatbot import ExternalCall
+from utils.metrics import merge_snapshots
+from utils.session import SessionStore
+
+# Threads per worker for weather and time lookups, which are answered
+# when they complete rather than holding up the next batch.
+EXTERNAL_CALL_THREADS = 8
+
+def memory_usage():
+    """Return this process's memory use in kB: rss, pss and private pages.
+
+    Pages shared copy-on-write with the parent count fully towards rss but
+    only proportionally towards pss, so pss/private show the real per-worker
+    cost. Values are None where /proc is unavailable.
+    """
+    usage = {'rss': None, 'pss': None, 'private': None}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        kilobytes = lambda name: int(fields[name].split()[0])
+        usage['rss'] = kilobytes('Rss')
+        usage['pss'] = kilobytes('Pss')
+        usage['private'] = kilobytes('Private_Clean') + kilobytes('Private_Dirty')
+    except (OSError, KeyError, ValueError):
+        pass
+    return usage
+
+def worker_for(session_id, num_workers):
+    """Sticky route: always send one session to the same worker."""
+    return zlib.crc32(session_id.encode('utf-8')) % num_workers
+
+def _worker_stats(chatbot, sessions):
+    return {
+        'pid': os.getpid(),
+        'sessions': len(sessions),
+        'routing_cache': chatbot.routing_cache.stats(),
+        **memory_usage(),
+    }
+
+def _worker_main(chatbot, conn, inherited, max_batch, idle_timeout):
+    """Serve batches of (request_id, session_id, message) from the parent."""
+    # Drop the pipes to earlier workers so they see EOF if the parent dies.
+    for other in inherited:
+        other.close()
+    # Start from zero rather than with the parent's warm-up counts.
+    chatbot.reset_metrics()
+    send_lock = threading.Lock()
+    external = ThreadPoolExecutor(max_workers=EXTERNAL_CALL_THREADS, thread_name_prefix='external')
+
+    def send(results):
+        with send_lock:
+            conn.send(results)
+
+    def send_external(request_id, call):
+        try:
+            response = call()
+        except Exception as e:
+            response = e
+        try:
+            send([(request_id, response)])
+        except (OSError, EOFError):
+            pass
+
+    sessions = SessionStore(idle_timeout=idle_timeout)
+    last_expiry = time.monotonic()
+    stopping = False
+    while not stopping:
+        requests = []
+        try:
+            while not stopping and len(requests) < max_batch and (not requests or conn.poll()):
+                command = conn.recv()
+                if command[0] == 'batch':
+                    requests.extend(command[1])
+                elif command[0] == 'stats':
+                    send([(command[1], _worker_stats(chatbot, sessions))])
+                elif command[0] == 'metrics':
+                    send([(command[1], chatbot.metrics.snapshot())])
+                elif command[0] == 'reload':
+                    # The snapshot was refreshed by the parent; batches keep
+                    # being served on the old models until the swap.
+                    chatbot.reload_models()
+                    send([(command[1], os.getpid())])
+                elif command[0] == 'stop':
+                    stopping = True
+        except (EOFError, KeyboardInterrupt):
+            stopping = True
+
+        if requests:
+            request_ids = [request_id for request_id, _, _ in requests]
+            messages = [message for _, _, message in requests]
+            batch_sessions = [sessions.get_or_create(session_id)[0] for _, session_id, _ in requests]
+            try:
+                responses = chatbot.handle_batch(messages, batch_sessions, defer_external=True)
+            except Exception as e:
+                chatbot.metrics.increment('chatbot_errors_total', stage='batch')
+                print(f"Error handling batch in worker {os.getpid()}: {str(e)}")
+                responses = [e] * len(requests)
+            ready = []
+            for request_id, response in zip(request_ids, responses):
+                if isinstance(response, ExternalCall):
+                    # Answered from the pool when the lookup completes.
+                    external.submit(send_external, request_id, response)
+                else:
+                    ready.append((request_id, response))
+            try:
+                if ready:
+                    send(ready)
+            except (OSError, EOFError):
+                return
+
+        if time.monotonic() - last_expiry > 60:
+            sessions.expire()
+            last_expiry = time.monotonic()
+
+class WorkerPool:
+    """Pre-forked worker processes sharing one copy of the loaded models.
+
+    The parent builds the Chatbot (QA/intent matrices and ticket inventory)
+    once, then forks the workers. Model arrays are never written after
+    loading, so their pages stay shared copy-on-write; gc.freeze() keeps the
+    collector from touching (and so copying) the parent's objects, and
+    snapshot-loaded matrices are file-backed memory maps shared through the
+    page cache. Each session is pinned to one worker by hashing its id, and
+    its state lives only in that worker.
+
+    Seats must be sold from one place, so more than one worker requires a
+    durable inventory (a SqliteInventory, server.py --tickets tickets.db):
+    each worker would otherwise sell the same seats from its own copy of an
+    in-memory one.
+    """
+
+    def __init__(self, chatbot, num_workers=None, max_pending=1024, max_batch=64,
+                 idle_timeout=1800):
+        self.chatbot = chatbot
+        self.num_workers = num_workers or os.cpu_count() or 1
+        if self.num_workers > 1 and not chatbot.tickets.durable:
+            raise ValueError(
+                f"{self.num_workers} workers would each sell seats from their own copy of the "
+                "in-memory ticket inventory; use a SQLite inventory (python -m "
+                "utils.sqlite_inventory, then --tickets tickets.db) or a single worker")
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self._request_ids = itertools.count()
+        self._workers = []
+
+    def start(self):
+        """Fork the workers. Must be called before any threads are started."""
+        context = multiprocessing.get_context('fork')
+        self.chatbot.warm_up()
+        gc.collect()
+        gc.freeze()
+        for _ in range(self.num_workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(
+                    self.chatbot,
+                    child_conn,
+                    [worker['conn'] for worker in self._workers],
+                    self.max_batch,
+                    self.idle_timeout,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._workers.append({
+                'process': process,
+                'conn': parent_conn,
+                'send_lock': threading.Lock(),
+                'pending': {},
+            })
+        gc.unfreeze()
+
+        # Reader threads are only started once every worker has been forked.
+        for worker in self._workers:
+            worker['reader'] = threading.Thread(
+                target=self._read_responses, args=(worker,), daemon=True)
+            worker['reader'].start()
+        return self
+
+    def stop(self):
+        for worker in self._workers:
+            try:
+                with worker['send_lock']:
+                    worker['conn'].send(('stop',))
+            except (OSError, EOFError):
+                pass
+        for worker in self._workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+        self._workers = []
+
+    def submit(self, session_id, message):
+        """Send a message to the session's worker; return a Future response.
+
+        Raises queue.Full when that worker already has max_pending requests.
+        """
+        worker = self._workers[worker_for(session_id, self.num_workers)]
+        if len(worker['pending']) >= self.max_pending:
+            raise queue.Full()
+        return self._send(worker, 'batch', [(session_id, message)])
+
+    def stats(self):
+        """Return per-worker pid, session count, routing cache and memory usage."""
+        futures = [self._send(worker, 'stats') for worker in self._workers]
+        return [future.result(timeout=10) for future in futures]
+
+    def metrics(self):
+        """Return the workers' metrics snapshots merged into one."""
+        futures = [self._send(worker, 'metrics') for worker in self._workers]
+        return merge_snapshots([future.result(timeout=10) for future in futures])
+
+    def reload(self):
+        """Reload the models everywhere without restarting the workers.
+
+        The parent refits or refreshes the snapshot once, then each worker
+        loads it in a background thread and swaps it in (see
+        Chatbot.reload_models). Returns the pids of the workers notified.
+        """
+        self.chatbot.reload_models(background=False)
+        futures = [self._send(worker, 'reload') for worker in self._workers]
+        return [future.result(timeout=10) for future in futures]
+
+    def _send(self, worker, kind, items=None):
+        future = Future()
+        request_id = next(self._request_ids)
+        worker['pending'][request_id] = future
+        if kind == 'batch':
+            command = ('batch', [(request_id,) + item for item in items])
+        else:
+            command = (kind, request_id)
+        try:
+            with worker['send_lock']:
+                worker['conn'].send(command)
+        except (OSError, EOFError) as e:
+            worker['pending'].pop(request_id, None)
+            future.set_exception(e)
+        return future
+
+    def _read_responses(self, worker):
+        while True:
+            try:
+                results = worker['conn'].recv()
+            except (EOFError, OSError):
+                break
+            for request_id, result in results:
+                future = worker['pending'].pop(request_id, None)
+                if future is None:
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+        error = RuntimeError(f"worker {worker['process'].pid} exited")
+        for request_id in list(worker['pending']):
+            future = worker['pending'].pop(request_id, None)
+            if future is not None and not future.done():
+                future.set_exception(error)